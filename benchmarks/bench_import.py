@@ -0,0 +1,68 @@
+# bench_import.py
+#
+# Mide el tiempo de importación del camino de síntesis de `src` y verifica que no cargue
+# las dependencias de graficado y análisis. Sale con código 1 si alguna se carga o si se
+# supera el tiempo máximo.
+#
+#   python benchmarks/bench_import.py --max-seconds 0.5
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que una importación de síntesis pura no debe cargar
+LEAN_MODULES = [
+    'src.sound_signal',
+    'src.composite_signal',
+    'src.rhythm_signal',
+    'src.batch_signal',
+    'src.dataset_generator',
+]
+FORBIDDEN = ['matplotlib', 'seaborn', 'librosa', 'scipy', 'torch']
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def measure(modules=LEAN_MODULES, forbidden=FORBIDDEN, repeats=5):
+    """
+    Importa los módulos en procesos nuevos y retorna el mejor tiempo y los módulos prohibidos cargados.
+    """
+    code = PROBE.format(modules=modules, forbidden=forbidden)
+    results = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, check=True,
+                                capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'seconds': min(r['seconds'] for r in results),
+        'loaded': sorted(set(m for r in results for m in r['loaded'])),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tiempo de importación del camino de síntesis.")
+    parser.add_argument('--max-seconds', type=float, default=0.5)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    result = measure(repeats=args.repeats)
+    print(f"Importación de síntesis: {result['seconds'] * 1000:.1f} ms")
+    failed = False
+    if result['loaded']:
+        print(f"ERROR: se cargaron dependencias pesadas: {', '.join(result['loaded'])}")
+        failed = True
+    if result['seconds'] > args.max_seconds:
+        print(f"ERROR: la importación supera {args.max_seconds:.2f} s")
+        failed = True
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,61 @@
+# bench_inference.py
+#
+# Verifica la paridad del modelo de inferencia (BatchNorm plegada, TorchScript/torch.compile,
+# cuantización dinámica int8) con el CNN_LSTM eager y mide latencia y rendimiento por
+# tamaño de lote en CPU. Sale con código 1 si alguna variante no supera la paridad.
+#
+#   python benchmarks/bench_inference.py --modes eager script --quantized both --batch-sizes 1 8 32
+
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.inference import MODES, build_inference_model, check_parity, benchmark, configure_threads
+from src.model import DEFAULT_CHECKPOINT, load_model
+
+# Diferencia máxima de logits admitida: float32 exacto salvo reordenación de operaciones,
+# e int8 con el error propio de la cuantización
+FLOAT_ATOL = 1e-4
+QUANTIZED_ATOL = 0.1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Paridad y rendimiento de la inferencia en CPU.")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    parser.add_argument('--modes', nargs='+', default=['eager', 'script'], choices=MODES)
+    parser.add_argument('--quantized', default='both', choices=['no', 'yes', 'both'])
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[1, 8, 32, 64])
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=None, help="Hilos intra-operación (por defecto, núcleos).")
+    parser.add_argument('--json', default=None, help="Ruta donde guardar el informe en JSON.")
+    args = parser.parse_args()
+
+    configure_threads(args.threads)
+    reference = load_model(args.checkpoint)
+    quantized_options = {'no': [False], 'yes': [True], 'both': [False, True]}[args.quantized]
+
+    results = []
+    failed = False
+    for mode in args.modes:
+        for quantized in quantized_options:
+            model = build_inference_model(args.checkpoint, mode=mode, quantized=quantized)
+            parity = check_parity(model, reference, atol=QUANTIZED_ATOL if quantized else FLOAT_ATOL)
+            name = f"{mode}{' + int8' if quantized else ''}"
+            print(f"{name}: diferencia máxima {parity['max_abs_diff']:.2e}, "
+                  f"coincidencia de clase {parity['argmax_agreement']:.0%}")
+            if not parity['ok']:
+                print(f"ERROR: {name} no supera la paridad con el modelo eager")
+                failed = True
+            report = benchmark(model, batch_sizes=args.batch_sizes, iterations=args.iterations)
+            for row in report:
+                print(f"  lote {row['batch_size']:>4}: {row['latency_ms']:8.2f} ms "
+                      f"(p90 {row['p90_ms']:.2f} ms), {row['samples_per_sec']:8.1f} ejemplos/s")
+            results.append({'mode': mode, 'quantized': quantized, 'parity': parity, 'report': report})
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=4)
+    sys.exit(1 if failed else 0)
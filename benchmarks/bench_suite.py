@@ -0,0 +1,345 @@
+# bench_suite.py
+#
+# Suite de benchmarks reproducible: síntesis (tonos, acordes, ritmo) según número de
+# componentes y duración, escritura WAV, espectrograma/chroma, DataLoader (sintético y de
+# los datasets en disco: PNG, .npz y shards) según num_workers y pasos de
+# entrenamiento/inferencia de CNN_LSTM en CPU. Todos los resultados son rendimientos
+# (mayor es mejor) y se guardan en JSON para comparar entre commits.
+#
+#   python benchmarks/bench_suite.py --output bench.json
+#   python benchmarks/bench_suite.py --baseline bench.json --threshold 0.15 --filter synthesis
+#
+# Con --baseline sale con código 1 si algún caso rinde menos que (1 - threshold) veces el
+# valor de referencia.
+
+import io
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import itertools
+import subprocess
+import contextlib
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import numpy as np
+
+SAMPLE_RATE = 44100
+
+# Registro de casos: nombre -> (función, parámetros a combinar)
+CASES = {}
+
+
+def case(name, **grid):
+    """
+    Registra un caso de benchmark. La función recibe una combinación de los parámetros de
+    grid y retorna (valor, unidad), con valor = unidades de trabajo por segundo.
+    """
+    def register(fn):
+        CASES[name] = (fn, grid)
+        return fn
+    return register
+
+
+def best_time(fn, repeats=3, warmup=1):
+    """
+    Mejor tiempo (s) de repeats ejecuciones de fn tras warmup ejecuciones de calentamiento.
+    La salida estándar de fn se descarta.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            fn()
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def _components(count, rng):
+    return [{'amplitude': 1.0, 'freq': float(rng.uniform(100, 4000)), 'phase': 0.0} for _ in range(count)]
+
+
+@case('synthesis.tone', duration=[1.0, 5.0, 30.0])
+def bench_tone(duration, repeats):
+    from src.sound_signal import Signal
+
+    signal = Signal(1.0, 440.0, 0.0, SAMPLE_RATE, duration)
+    seconds = best_time(signal.generate_signal, repeats)
+    return signal.num_samples / seconds, 'samples/s'
+
+
+@case('synthesis.chord', components=[3, 8, 32], duration=[1.0, 5.0, 30.0])
+def bench_chord(components, duration, repeats):
+    from src.composite_signal import CompositeSignal
+
+    signal = CompositeSignal(SAMPLE_RATE, duration)
+    for comp in _components(components, np.random.default_rng(0)):
+        signal.add_component(comp['amplitude'], comp['freq'], comp['phase'])
+    seconds = best_time(signal.build_signal, repeats)
+    return signal.num_samples / seconds, 'samples/s'
+
+
+@case('synthesis.chord_periodic', components=[3, 8], period=[0.1, 1.0])
+def bench_chord_periodic(components, period, repeats):
+    from src.composite_signal import CompositeSignal
+
+    signal = CompositeSignal(SAMPLE_RATE, 5.0, period=period)
+    for comp in _components(components, np.random.default_rng(0)):
+        signal.add_component(comp['amplitude'], comp['freq'], comp['phase'])
+    seconds = best_time(signal.build_signal, repeats)
+    return signal.num_samples / seconds, 'samples/s'
+
+
+@case('synthesis.rhythm', components=[1, 3], duration=[5.0, 30.0])
+def bench_rhythm(components, duration, repeats):
+    from src.rhythm_signal import RhythmSignal
+
+    rng = np.random.default_rng(0)
+    signal = RhythmSignal(SAMPLE_RATE, duration, unit_time=duration / 16)
+    for _ in range(16):
+        signal.add_segment(_components(components, rng))
+    seconds = best_time(signal.build_signal, repeats)
+    return signal.num_samples / seconds, 'samples/s'
+
+
+@case('synthesis.batch', components=[1, 3], batch=[16, 64])
+def bench_render_batch(components, batch, repeats):
+    from src.batch_signal import render_batch
+
+    rng = np.random.default_rng(0)
+    specs = [{'components': _components(components, rng)} for _ in range(batch)]
+    seconds = best_time(lambda: render_batch(specs, SAMPLE_RATE, 5.0), repeats)
+    return batch * SAMPLE_RATE * 5.0 / seconds, 'samples/s'
+
+
+@case('io.write_wav', duration=[5.0, 30.0])
+def bench_write_wav(duration, repeats):
+    from src.audio_io import write_wav
+
+    signal = np.cos(np.arange(int(SAMPLE_RATE * duration), dtype=np.float32) * 0.05)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.wav')
+        seconds = best_time(lambda: write_wav(path, signal, SAMPLE_RATE), repeats)
+        size = os.path.getsize(path)
+    return size / seconds / 1e6, 'MB/s'
+
+
+@case('features.spectrogram', batch=[1, 32])
+def bench_spectrogram(batch, repeats):
+    from src.feature_engine import get_engine
+
+    signals = np.random.default_rng(0).standard_normal((batch, int(SAMPLE_RATE * 5.0))).astype(np.float32)
+    engine = get_engine(SAMPLE_RATE)
+    seconds = best_time(lambda: engine.log_spectrogram(signals), repeats)
+    return batch / seconds, 'signals/s'
+
+
+@case('features.chroma', batch=[1, 32])
+def bench_chroma(batch, repeats):
+    from src.feature_engine import get_engine
+
+    signals = np.random.default_rng(0).standard_normal((batch, int(SAMPLE_RATE * 5.0))).astype(np.float32)
+    engine = get_engine(SAMPLE_RATE)
+    seconds = best_time(lambda: engine.chroma(signals), repeats)
+    return batch / seconds, 'signals/s'
+
+
+@case('loader.synthetic', num_workers=[0, 2])
+def bench_loader(num_workers, repeats):
+    from torch.utils.data import DataLoader
+    from src.datasets import SyntheticDataset
+
+    samples = 64
+    dataset = SyntheticDataset(samples_per_epoch=samples, seed=0)
+    loader = DataLoader(dataset, batch_size=16, num_workers=num_workers)
+    # El arranque de los workers forma parte del costo real de una época
+    seconds = best_time(lambda: sum(1 for _ in loader), repeats, warmup=0)
+    return samples / seconds, 'samples/s'
+
+
+_disk_data = None
+
+
+def disk_dataset_dir(per_class=8):
+    """
+    Directorio temporal, creado una vez por ejecución, con un conjunto pequeño en los tres
+    formatos en disco: espectrogramas PNG, características .npz y shards.
+    """
+    global _disk_data
+    if _disk_data is not None:
+        return _disk_data.name
+
+    from src.batch_signal import render_batch
+    from src.dataset_generator import CLASSES
+    from src.features import save_features
+    from src.shards import pack_shards
+    from src.viz import plot_spectrogram
+
+    _disk_data = tempfile.TemporaryDirectory(prefix='bench_loader_')
+    root = _disk_data.name
+    rng = np.random.default_rng(0)
+    for cls_name in CLASSES:
+        os.makedirs(os.path.join(root, cls_name))
+        signals = render_batch([{'components': _components(3, rng)} for _ in range(per_class)], SAMPLE_RATE, 5.0)
+        for idx, signal in enumerate(signals):
+            plot_spectrogram(signal, SAMPLE_RATE, save_path=os.path.join(root, cls_name, f'{idx:03d}_spectrogram.png'))
+            save_features(signal, SAMPLE_RATE, {'class': cls_name, 'index': idx},
+                          os.path.join(root, 'features', cls_name))
+    pack_shards(os.path.join(root, 'features'), os.path.join(root, 'shards'))
+    return root
+
+
+@case('loader.disk', dataset=['images', 'features', 'shards'], num_workers=[0, 2])
+def bench_disk_loader(dataset, num_workers, repeats):
+    from torch.utils.data import DataLoader
+    from src.datasets import SpectrogramImageDataset, FeatureDataset, ShardedDataset
+
+    root = disk_dataset_dir()
+    if dataset == 'images':
+        data = SpectrogramImageDataset(root)
+    elif dataset == 'features':
+        data = FeatureDataset(os.path.join(root, 'features'))
+    else:
+        data = ShardedDataset(os.path.join(root, 'shards'))
+    loader = DataLoader(data, batch_size=16, num_workers=num_workers)
+    seconds = best_time(lambda: sum(1 for _ in loader), repeats, warmup=0)
+    return len(data) / seconds, 'samples/s'
+
+
+@case('model.infer', batch=[1, 32])
+def bench_infer(batch, repeats):
+    import torch
+    from src.model import load_model
+
+    model = load_model()
+    x = torch.randn(batch, 3, 128, 128)
+
+    def step():
+        with torch.inference_mode():
+            model(x)
+    return 1 / best_time(step, repeats), 'steps/s'
+
+
+@case('model.train', batch=[32])
+def bench_train(batch, repeats):
+    import torch
+    from src.model import CNN_LSTM, NUM_CLASSES
+
+    torch.manual_seed(0)
+    model = CNN_LSTM(NUM_CLASSES).train()
+    optimizer = torch.optim.Adam(model.parameters(), lr=1e-3)
+    criterion = torch.nn.CrossEntropyLoss()
+    x = torch.randn(batch, 3, 128, 128)
+    y = torch.randint(0, NUM_CLASSES, (batch,))
+
+    def step():
+        optimizer.zero_grad()
+        criterion(model(x), y).backward()
+        optimizer.step()
+    return 1 / best_time(step, repeats), 'steps/s'
+
+
+def expand(name):
+    """
+    Combinaciones de parámetros de un caso, como lista de diccionarios.
+    """
+    _, grid = CASES[name]
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def result_id(name, params):
+    return name + ''.join(f'[{key}={value}]' for key, value in params.items())
+
+
+def environment():
+    """
+    Metadatos de la ejecución para que los resultados sean comparables.
+    """
+    import torch
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT, check=True,
+                                capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'torch': torch.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run(names, repeats=3):
+    results = []
+    for name in names:
+        fn, _ = CASES[name]
+        for params in expand(name):
+            value, unit = fn(repeats=repeats, **params)
+            results.append({'id': result_id(name, params), 'case': name, 'params': params,
+                            'value': value, 'unit': unit})
+            print(f"{results[-1]['id']:<55} {value:>14.1f} {unit}")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compara con una ejecución anterior.
+
+    Retorna:
+    - Lista de (id, valor de referencia, valor actual, cambio relativo) de los casos que
+      empeoraron más que threshold.
+    """
+    reference = {entry['id']: entry['value'] for entry in baseline['results']}
+    regressions = []
+    for entry in results:
+        if entry['id'] not in reference:
+            continue
+        change = entry['value'] / reference[entry['id']] - 1
+        if change < -threshold:
+            regressions.append((entry['id'], reference[entry['id']], entry['value'], change))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Suite de benchmarks de síntesis, E/S, características y modelo.")
+    parser.add_argument('--filter', nargs='*', default=None, help="Ejecutar solo los casos que contengan alguno de estos textos.")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', default=None, help="Ruta donde guardar los resultados en JSON.")
+    parser.add_argument('--baseline', default=None, help="JSON de una ejecución anterior con la que comparar.")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Empeoramiento relativo máximo admitido.")
+    parser.add_argument('--list', action='store_true', help="Listar los casos y salir.")
+    args = parser.parse_args()
+
+    names = [name for name in CASES if not args.filter or any(text in name for text in args.filter)]
+    if args.list:
+        for name in names:
+            for params in expand(name):
+                print(result_id(name, params))
+        sys.exit(0)
+
+    report = {'environment': environment(), 'results': run(names, repeats=args.repeats)}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report['results'], baseline, args.threshold)
+        for result, before, after, change in regressions:
+            print(f"REGRESIÓN: {result}: {before:.1f} -> {after:.1f} ({change:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"Sin regresiones mayores al {args.threshold:.0%} frente a {args.baseline}")
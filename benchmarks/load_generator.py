@@ -0,0 +1,157 @@
+# load_generator.py
+#
+# Envía peticiones concurrentes al servidor de clasificación (src/server.py) y reporta la
+# latencia p50/p99 y el rendimiento. Las señales se sintetizan en memoria con render_batch.
+#
+#   python -m src.server --checkpoint cnn_lstm_features.pth --port 8000 &
+#   python benchmarks/load_generator.py --url http://127.0.0.1:8000 --concurrency 16 --requests 512
+#   python benchmarks/load_generator.py --unix /tmp/cnn_lstm.sock
+
+import io
+import os
+import sys
+import json
+import time
+import wave
+import socket
+import random
+import argparse
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from src.audio_io import quantize_int16
+from src.batch_signal import render_batch
+from src.dataset_generator import SAMPLE_RATE, DURATION_SEG, tone_spec, chord_spec
+from src.utils import calculate_note_frequencies
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    HTTPConnection sobre un socket Unix.
+    """
+    def __init__(self, path, timeout=60):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+def make_payloads(count, seed=0, sample_rate=SAMPLE_RATE, duration=DURATION_SEG):
+    """
+    Sintetiza count tonos y acordes aleatorios y los codifica como WAV en memoria.
+    """
+    rng = random.Random(seed)
+    notes = calculate_note_frequencies()
+    names = list(notes.keys())
+    specs = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            specs.append(tone_spec(rng.choice(names), notes))
+        else:
+            specs.append(chord_spec(rng.sample(names, 3), notes))
+
+    payloads = []
+    for signal in render_batch(specs, sample_rate=sample_rate, duration_seg=duration):
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(quantize_int16(signal))
+        payloads.append(buffer.getvalue())
+    return payloads
+
+
+def run(connect, payloads, num_requests, concurrency):
+    """
+    Envía num_requests peticiones repartidas entre concurrency hilos, cada uno con su
+    propia conexión persistente.
+
+    Retorna:
+    - (latencias en segundos, número de errores, tiempo total).
+    """
+    per_worker = [num_requests // concurrency + (i < num_requests % concurrency) for i in range(concurrency)]
+
+    def worker(worker_id):
+        connection = connect()
+        latencies, errors = [], 0
+        for i in range(per_worker[worker_id]):
+            payload = payloads[(worker_id + i * concurrency) % len(payloads)]
+            start = time.perf_counter()
+            try:
+                connection.request('POST', '/classify', body=payload, headers={'Content-Type': 'audio/wav'})
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                connection.close()
+                connection = connect()
+                continue
+            latencies.append(time.perf_counter() - start)
+        connection.close()
+        return latencies, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies = [latency for worker_latencies, _ in results for latency in worker_latencies]
+    return latencies, sum(errors for _, errors in results), elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generador de carga para el servidor de clasificación.")
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--unix', default=None, help="Ruta del socket Unix del servidor (en lugar de --url).")
+    parser.add_argument('--requests', type=int, default=256)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--payloads', type=int, default=32, help="Número de señales distintas a enviar.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', default=None, help="Ruta donde guardar el informe en JSON.")
+    args = parser.parse_args()
+
+    if args.unix:
+        def connect():
+            return UnixHTTPConnection(args.unix)
+        target = args.unix
+    else:
+        url = urlparse(args.url)
+
+        def connect():
+            return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+        target = args.url
+
+    payloads = make_payloads(args.payloads, seed=args.seed)
+    latencies, errors, elapsed = run(connect, payloads, args.requests, args.concurrency)
+    if not latencies:
+        print(f"ERROR: ninguna petición a {target} tuvo éxito ({errors} errores)")
+        sys.exit(1)
+
+    latencies_ms = np.array(latencies) * 1000
+    report = {
+        'target': target,
+        'requests': len(latencies),
+        'errors': errors,
+        'concurrency': args.concurrency,
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'mean_ms': float(latencies_ms.mean()),
+        'requests_per_sec': len(latencies) / elapsed,
+    }
+    print(f"{report['requests']} peticiones a {target} ({errors} errores), concurrencia {args.concurrency}")
+    print(f"  p50 {report['p50_ms']:.1f} ms, p99 {report['p99_ms']:.1f} ms, media {report['mean_ms']:.1f} ms")
+    print(f"  {report['requests_per_sec']:.1f} peticiones/s")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=4)
+    sys.exit(1 if errors else 0)
@@ -0,0 +1,41 @@
+# generate_data.py
+
+import os
+import logging
+import argparse
+import contextlib
+from src.dataset_generator import generate_dataset
+from src.instrumentation import METRICS, profile
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera el conjunto de datos de señales musicales.")
+    parser.add_argument('--output-dir', default='data', help="Directorio raíz de los datos.")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla maestra.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Número de procesos.")
+    parser.add_argument('--no-spectrograms', action='store_true', help="No guardar espectrogramas PNG.")
+    parser.add_argument('--features', action='store_true', help="Guardar características .npz en data/features.")
+    parser.add_argument('--feature-dtype', default='float16', choices=['float16', 'float32'])
+    parser.add_argument('--force', action='store_true', help="Reconstruir todo aunque el manifiesto esté al día.")
+    parser.add_argument('--prune', action='store_true', help="Eliminar los archivos de tareas que ya no están en el plan.")
+    parser.add_argument('--period', default=None,
+                        help="Repetir un ciclo en tonos y acordes: 'auto' (periodo exacto) o segundos "
+                             "(cuantiza las frecuencias a múltiplos de 1/periodo Hz).")
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    parser.add_argument('--metrics', default=None, help="Ruta donde guardar el resumen de tiempos por etapa (JSON).")
+    parser.add_argument('--profile', default=None, help="Ruta donde guardar un perfil de la ejecución.")
+    parser.add_argument('--profiler', default='cprofile', choices=['cprofile', 'pyinstrument'])
+    args = parser.parse_args()
+    period = args.period if args.period in (None, 'auto') else float(args.period)
+
+    logging.basicConfig(level=args.log_level, format='%(message)s')
+    if args.metrics:
+        METRICS.start_memory_sampling()
+    with profile(args.profile, args.profiler) if args.profile else contextlib.nullcontext():
+        generate_dataset(args.output_dir, master_seed=args.seed, num_workers=args.workers,
+                         spectrograms=not args.no_spectrograms, features=args.features,
+                         feature_dtype=args.feature_dtype, force=args.force, prune=args.prune,
+                         period=period)
+    if args.metrics:
+        METRICS.stop_memory_sampling()
+        METRICS.log_summary()
+        METRICS.write_summary(args.metrics)
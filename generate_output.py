@@ -1,18 +1,21 @@
 # generate_output.py
 
 import os
+import logging
 import numpy as np
 from src.sound_signal import Signal
 from src.composite_signal import CompositeSignal
 from src.rhythm_signal import RhythmSignal
 
+logger = logging.getLogger(__name__)
+
 # Directorio de salida
 output_dir = 'output_test'
 if not os.path.exists(output_dir):
     os.makedirs(output_dir)
 
 def generate_signal_output():
-    print("\nGenerando señal simple...")
+    logger.info('Generando señal simple...')
     # Parámetros de la señal simple
     amplitude = 1.0
     freq = 440.0  # A4
@@ -29,7 +32,7 @@ def generate_signal_output():
     signal.save_wav(filename=os.path.join(output_dir, 'signal.wav'))
 
 def generate_composite_signal_output():
-    print("\nGenerando señal compuesta...")
+    logger.info('Generando señal compuesta...')
     # Crear instancia de CompositeSignal
     composite = CompositeSignal(sample_rate=44100, duration_seg=5.0)
 
@@ -46,7 +49,7 @@ def generate_composite_signal_output():
     composite.save_wav(filename=os.path.join(output_dir, 'composite_signal.wav'))
 
 def generate_rhythm_signal_output():
-    print("\nGenerando señal rítmica...")
+    logger.info('Generando señal rítmica...')
     # Crear instancia de RhythmSignal
     rhythm = RhythmSignal(sample_rate=44100, duration_seg=5.0, unit_time=1.0)
 
@@ -68,8 +71,10 @@ def generate_rhythm_signal_output():
     rhythm.save_wav(filename=os.path.join(output_dir, 'rhythm_signal.wav'))
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
     # Generar salidas para cada tipo de señal
     generate_signal_output()
     generate_composite_signal_output()
     generate_rhythm_signal_output()
-    print(f"\nResultados guardados en el directorio: {output_dir}")
+    logger.info('Resultados guardados en el directorio: %s', output_dir)
@@ -0,0 +1,200 @@
+# audio_io.py
+
+import os
+import json
+import uuid
+import wave
+from contextlib import contextmanager
+import numpy as np
+from .instrumentation import timed, count
+from .utils import INT16_MAX
+
+
+@contextmanager
+def atomic_path(filename):
+    """
+    Proporciona una ruta temporal en el mismo directorio que filename y la renombra
+    atómicamente (os.replace) al salir sin errores. Si ocurre un error se elimina el
+    temporal, de modo que nunca quedan archivos a medio escribir con el nombre final.
+
+    Parámetros:
+    - filename: Ruta final del archivo.
+    """
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    base, ext = os.path.splitext(os.path.basename(filename))
+    # Nombre único por proceso para que dos escritores nunca compartan temporal
+    tmp_path = os.path.join(directory, f'.{base}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp{ext}')
+    try:
+        yield tmp_path
+        os.replace(tmp_path, filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_metadata(filename, metadata):
+    """
+    Guarda los metadatos en un archivo JSON de forma atómica.
+    """
+    with atomic_path(filename) as tmp_path:
+        with open(tmp_path, 'w') as f:
+            json.dump(metadata, f, indent=4)
+
+
+def quantize_int16(signal, out=None, normalize=True):
+    """
+    Convierte una señal de punto flotante a PCM int16 escribiendo directamente en out. La
+    normalización se aplica en el mismo producto, sin copias intermedias de punto flotante.
+
+    Parámetros:
+    - signal: Señal de punto flotante.
+    - out: Arreglo int16 preasignado de la misma forma (se crea si es None).
+    - normalize: Si es True escala por el pico como normalize_signal; si es False la señal
+      debe estar ya en [-1, 1].
+
+    Retorna:
+    - El arreglo int16.
+    """
+    signal = np.asarray(signal)
+    if out is None:
+        out = np.empty(signal.shape, dtype=np.int16)
+    elif out.shape != signal.shape or out.dtype != np.int16:
+        raise ValueError(f"El búfer de salida debe ser int16 con forma {signal.shape}.")
+
+    scale = INT16_MAX
+    if normalize and signal.size:
+        peak = max(np.max(signal), -np.min(signal))
+        if peak > 1e-8:
+            scale = INT16_MAX / peak
+    # Igual que np.int16(señal * INT16_MAX): producto en punto flotante y truncamiento
+    np.multiply(signal, scale, out=out, casting='unsafe')
+    return out
+
+
+@timed('io.write_wav')
+def write_wav(filename, signal, sample_rate, metadata=None, out=None):
+    """
+    Normaliza la señal, la convierte a int16 y la guarda en un archivo WAV de forma atómica.
+
+    Parámetros:
+    - filename: Nombre del archivo WAV a guardar.
+    - signal: Señal de punto flotante.
+    - sample_rate: Tasa de muestreo de la señal.
+    - metadata: Diccionario con metadatos para guardar en un archivo JSON asociado.
+    - out: Búfer int16 preasignado opcional para la cuantización (ver quantize_int16).
+
+    Retorna:
+    - La ruta del archivo de metadatos, o None si no se proporcionaron.
+    """
+    pcm = quantize_int16(signal, out=out)
+
+    with atomic_path(filename) as tmp_path:
+        with wave.open(tmp_path, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(pcm)  # wave acepta el búfer directamente, sin pasar por bytes
+    count('bytes_written', pcm.nbytes)
+
+    if metadata:
+        metadata_filename = filename.replace('.wav', '_metadata.json')
+        write_metadata(metadata_filename, metadata)
+        return metadata_filename
+    return None
+
+
+@timed('io.write_pcm')
+def write_pcm(filename, signal, out=None, normalize=True):
+    """
+    Guarda la señal como PCM int16 little-endian sin cabecera, de forma atómica. El archivo
+    se escribe directamente desde el búfer int16.
+
+    Parámetros:
+    - filename: Nombre del archivo (.pcm / .raw).
+    - signal: Señal de punto flotante.
+    - out: Búfer int16 preasignado opcional (ver quantize_int16).
+    - normalize: Si es True normaliza la señal por su pico.
+    """
+    pcm = quantize_int16(signal, out=out, normalize=normalize).astype('<i2', copy=False)
+
+    with atomic_path(filename) as tmp_path:
+        with open(tmp_path, 'wb') as f:
+            f.write(memoryview(np.ascontiguousarray(pcm)).cast('B'))
+    count('bytes_written', pcm.nbytes)
+
+
+def iter_wav_blocks(filename, block_size=65536):
+    """
+    Lee un WAV PCM de 16 bits por bloques, sin cargarlo completo en memoria.
+
+    Parámetros:
+    - filename: Ruta del archivo WAV.
+    - block_size: Número de muestras por bloque.
+
+    Retorna:
+    - Generador de bloques float32 en [-1, 1] (los WAV estéreo se promedian a mono).
+    """
+    with wave.open(filename, 'rb') as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError("Solo se aceptan WAV PCM de 16 bits.")
+        channels = wav.getnchannels()
+        while True:
+            frames = wav.readframes(block_size)
+            if not frames:
+                return
+            block = np.frombuffer(frames, dtype='<i2').astype(np.float32) / INT16_MAX
+            if channels > 1:
+                block = block.reshape(-1, channels).mean(axis=1)
+            yield block
+
+
+class StreamingWavWriter:
+    """
+    Escritor de WAV mono int16 incremental: cada bloque se cuantiza y se escribe en cuanto
+    llega, y la cabecera se completa al cerrar. El archivo se escribe en un temporal y se
+    renombra atómicamente al cerrar sin errores.
+
+    Uso:
+        with StreamingWavWriter('salida.wav', 44100) as writer:
+            for block in bloques:
+                writer.write(block)
+    """
+    def __init__(self, filename, sample_rate, metadata=None):
+        self.filename = filename
+        self.sample_rate = sample_rate
+        self.metadata = metadata
+        self.frames_written = 0
+        self._atomic = None
+        self._wav = None
+        self._buffer = None  # Búfer int16 reutilizado entre bloques
+
+    def __enter__(self):
+        self._atomic = atomic_path(self.filename)
+        tmp_path = self._atomic.__enter__()
+        self._wav = wave.open(tmp_path, 'wb')
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(self.sample_rate)
+        return self
+
+    def write(self, block):
+        """
+        Escribe un bloque de punto flotante en [-1, 1].
+        """
+        block = np.asarray(block)
+        if self._buffer is None or len(self._buffer) < len(block):
+            self._buffer = np.empty(len(block), dtype=np.int16)
+        pcm = quantize_int16(block, out=self._buffer[:len(block)], normalize=False)
+        self._wav.writeframesraw(pcm)
+        self.frames_written += len(pcm)
+        count('bytes_written', pcm.nbytes)
+
+    def __exit__(self, exc_type, exc, tb):
+        self._wav.close()
+        self._atomic.__exit__(exc_type, exc, tb)
+        if exc_type is None and self.metadata:
+            write_metadata(self.filename.replace('.wav', '_metadata.json'), self.metadata)
+        return False
@@ -1,18 +1,39 @@
 # base_signal.py
 
+import logging
 import numpy as np
-import os
-import json
-from scipy.io.wavfile import write
-from .utils import normalize_signal, INT16_MAX
+from .audio_io import write_wav, write_pcm, quantize_int16, StreamingWavWriter
+from .instrumentation import timed
+from .oscillators import get_time_vector, oscillator, cycle_length, quantize_freqs, periodic_view
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de bloque por defecto para el renderizado por bloques (muestras)
+DEFAULT_BLOCK_SIZE = 65536
+
+# Tipo de dato de las señales generadas. Las fases se siguen calculando en float64 (el
+# argumento del coseno crece con el tiempo) y solo el resultado se guarda en este tipo.
+DEFAULT_DTYPE = np.float32
 
 class BaseSignal:
-    def __init__(self, sample_rate=44100, duration_seg=5.0):
+    def __init__(self, sample_rate=44100, duration_seg=5.0, oscillator='cos', dtype=DEFAULT_DTYPE, period=None):
         self.sample_rate = sample_rate
         self.duration_seg = duration_seg
+        self.oscillator = oscillator  # 'cos', 'rotation' o 'wavetable' (ver oscillators.py)
+        self.dtype = np.dtype(dtype)  # float32 (predeterminado) o float64
+        # None evalúa todas las muestras; 'auto' repite un ciclo si las frecuencias tienen un
+        # periodo exacto; un número de segundos fuerza ese periodo cuantizando las frecuencias
+        self.period = period
         self.signal = None
-        self.t = np.linspace(0, duration_seg, int(sample_rate * duration_seg), endpoint=False)
+        self._cycle = None  # Vista del primer ciclo de self.signal si se generó por repetición
+        self._pcm = None  # Búfer int16 reutilizado por save_wav / save_pcm
 
+    @property
+    def t(self):
+        # Vector de tiempo compartido y de solo lectura; solo se calcula si alguien lo usa
+        return get_time_vector(self.sample_rate, self.duration_seg)
+
+    @timed('signal.save_wav')
     def save_wav(self, filename="signal.wav", metadata=None):
         """
         Guarda la señal actual en un archivo WAV e incluye metadatos si se proporcionan.
@@ -24,26 +45,137 @@ class BaseSignal:
         if self.signal is None:
             raise RuntimeError("No se ha generado la señal.")
 
-        directory = os.path.dirname(filename)
-        if directory and not os.path.exists(directory):
-            os.makedirs(directory)
+        # Normalizar y cuantizar directamente al búfer int16, y guardar de forma atómica
+        metadata_filename = write_wav(filename, self.signal, self.sample_rate, metadata=metadata,
+                                      out=self._pcm_buffer())
+        logger.info('Señal guardada en %s', filename)
+        if metadata_filename:
+            logger.info('Metadatos guardados en %s', metadata_filename)
+
+    def save_pcm(self, filename="signal.pcm"):
+        """
+        Guarda la señal normalizada como PCM int16 little-endian sin cabecera.
+        """
+        if self.signal is None:
+            raise RuntimeError("No se ha generado la señal.")
+        write_pcm(filename, self.signal, out=self._pcm_buffer())
+        logger.info('Señal PCM guardada en %s', filename)
+
+    def to_int16(self):
+        """
+        Señal normalizada y cuantizada a int16, escrita en un búfer preasignado que se
+        reutiliza en cada llamada (copiarlo si se necesita conservarlo).
+        """
+        if self.signal is None:
+            raise RuntimeError("No se ha generado la señal.")
+        return quantize_int16(self.signal, out=self._pcm_buffer())
+
+    def _pcm_buffer(self):
+        if self._pcm is None or self._pcm.shape != self.signal.shape:
+            self._pcm = np.empty(self.signal.shape, dtype=np.int16)
+        return self._pcm
+
+    @property
+    def num_samples(self):
+        return int(self.sample_rate * self.duration_seg)
+
+    def _time_block(self, start, stop):
+        """
+        Vector de tiempo de las muestras [start, stop), idéntico al tramo correspondiente de self.t.
+        """
+        return np.arange(start, stop) * (self.duration_seg / self.num_samples)
+
+    def _cycle_length(self, freqs):
+        """
+        Longitud del ciclo común de las frecuencias según self.period y las frecuencias a
+        renderizar (cuantizadas si el periodo es forzado).
+
+        Retorna:
+        - (P, frecuencias), o (None, frecuencias) si hay que evaluar todas las muestras.
+        """
+        if self.period is None or not len(freqs):
+            return None, freqs
+        dt = self.duration_seg / self.num_samples
+        length = cycle_length(freqs, dt, self.period, max_length=self.num_samples)
+        if length is None:
+            return None, freqs
+        if self.period != 'auto':
+            freqs = quantize_freqs(freqs, dt, length)
+        return length, freqs
+
+    def period_view(self):
+        """
+        Vista de solo lectura (repeticiones, P) de la señal generada por repetición de un
+        ciclo, sin copiarlo. Útil para consumidores que solo leen la señal.
+        """
+        if self.signal is None or self._cycle is None:
+            raise RuntimeError("La señal no se generó por repetición de un ciclo (ver period).")
+        return periodic_view(self._cycle, self.num_samples)
+
+    def _oscillate(self, freq, phase, start=0, stop=None, t0=0.0):
+        """
+        cos(2π·freq·(t - t0) + phase) en las muestras [start, stop) con el oscilador configurado.
+        """
+        stop = self.num_samples if stop is None else stop
+        wave = oscillator(freq, phase, start, stop, self.duration_seg / self.num_samples,
+                          method=self.oscillator, t0=t0)
+        return wave.astype(self.dtype, copy=False)
+
+    def iter_blocks(self, block_size=DEFAULT_BLOCK_SIZE):
+        """
+        Genera la señal sin normalizar en bloques consecutivos de block_size muestras.
+        La fase se calcula a partir del índice absoluto de cada muestra, por lo que es
+        continua entre bloques. Debe ser implementado por las clases derivadas.
+        """
+        raise NotImplementedError("El método iter_blocks() debe ser implementado por la clase derivada.")
+
+    def predicted_peak(self):
+        """
+        Cota superior del valor absoluto de la señal sin normalizar, calculada sin renderizarla.
+        Debe ser implementado por las clases derivadas.
+        """
+        raise NotImplementedError("El método predicted_peak() debe ser implementado por la clase derivada.")
 
-        # Normalizar la señal
-        normalized_signal = normalize_signal(self.signal)
+    def render_blocks(self, block_size=DEFAULT_BLOCK_SIZE, normalization='two_pass'):
+        """
+        Genera la señal normalizada por bloques con memoria acotada.
 
-        # Convertir a int16
-        signal_int = np.int16(normalized_signal * INT16_MAX)
+        Parámetros:
+        - block_size: Número de muestras por bloque.
+        - normalization: 'two_pass' recorre la señal una vez para obtener el pico exacto (mismo
+          resultado que normalize_signal); 'predicted' usa predicted_peak() y evita la primera
+          pasada; None no normaliza.
+        """
+        if normalization == 'two_pass':
+            peak = max((np.max(np.abs(block)) for block in self.iter_blocks(block_size)), default=0.0)
+        elif normalization == 'predicted':
+            peak = self.predicted_peak()
+        elif normalization is None:
+            peak = 1.0
+        else:
+            raise ValueError(f"Normalización desconocida: {normalization}")
 
-        # Guardar el archivo WAV
-        write(filename, self.sample_rate, signal_int)
-        print(f'Señal guardada en {filename}')
+        scale = 1.0 / peak if peak > 1e-8 else 1.0
+        for block in self.iter_blocks(block_size):
+            block *= scale  # Cada bloque es nuevo: se escala en su sitio
+            yield block
 
-        # Guardar metadatos si se proporcionan
-        if metadata:
-            metadata_filename = filename.replace('.wav', '_metadata.json')
-            with open(metadata_filename, 'w') as f:
-                json.dump(metadata, f, indent=4)
-            print(f'Metadatos guardados en {metadata_filename}')
+    @timed('signal.save_wav_stream')
+    def save_wav_stream(self, filename, block_size=DEFAULT_BLOCK_SIZE, normalization='two_pass', metadata=None):
+        """
+        Guarda la señal en un archivo WAV escribiendo bloque a bloque, sin construir la señal
+        completa en memoria. No requiere haber llamado a build_signal/generate_signal.
+
+        Parámetros:
+        - filename: Nombre del archivo WAV a guardar.
+        - block_size: Número de muestras por bloque.
+        - normalization: Ver render_blocks.
+        - metadata: Diccionario con metadatos para guardar en un archivo JSON asociado.
+        """
+        with StreamingWavWriter(filename, self.sample_rate, metadata=metadata) as writer:
+            for block in self.render_blocks(block_size, normalization):
+                writer.write(block)
+        logger.info('Señal guardada por bloques en %s', filename)
 
     def plot_signal(self, show=True, save_path=None):
         """
@@ -0,0 +1,219 @@
+# batch_signal.py
+
+import logging
+import numpy as np
+from .instrumentation import timed, count
+from .oscillators import cycle_length, quantize_freqs, tile_cycle
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_MEMORY_MB = 256
+
+
+def _segment_bounds(n_segments, unit_time, sample_rate, n_samples):
+    """
+    Calcula los índices [inicio, fin) de cada segmento igual que RhythmSignal.build_signal.
+    """
+    bounds = []
+    for idx in range(n_segments):
+        start_time = idx * unit_time
+        start_idx = min(int(start_time * sample_rate), n_samples)
+        end_idx = min(int((start_time + unit_time) * sample_rate), n_samples)
+        bounds.append((start_idx, end_idx, start_time))
+    return bounds
+
+
+def _spec_segments(spec, sample_rate, duration_seg):
+    """
+    Convierte una especificación en una lista de segmentos y su unit_time.
+
+    Una especificación con 'components' se trata como un único segmento que cubre
+    toda la señal; una con 'segments' usa el 'unit_time' indicado.
+    """
+    if 'segments' in spec:
+        unit_time = spec.get('unit_time')
+        if unit_time is None:
+            raise ValueError("Las especificaciones rítmicas requieren 'unit_time'.")
+        return spec['segments'], float(unit_time)
+    if 'components' in spec:
+        components = []
+        for comp in spec['components']:
+            freq = comp['freq']
+            if freq > sample_rate / 2 and freq != 0.0:
+                logger.warning('La frecuencia %s Hz supera la mitad de la tasa de muestreo y puede causar aliasing.', freq)
+                continue
+            if freq == 0.0:
+                continue  # Placeholder, igual que CompositeSignal.build_signal
+            components.append(comp)
+        return [components], float(duration_seg)
+    raise ValueError("Cada especificación debe tener 'components' o 'segments'.")
+
+
+def _pack_group(segment_lists, n_segments, n_components):
+    """
+    Empaqueta los segmentos de un grupo en arreglos contiguos (filas, segmentos, componentes).
+    Las posiciones sin componente quedan con amplitud cero.
+    """
+    shape = (len(segment_lists), n_segments, n_components)
+    amplitudes = np.zeros(shape)
+    freqs = np.zeros(shape)
+    phases = np.zeros(shape)
+    for row, segments in enumerate(segment_lists):
+        for seg_idx, components in enumerate(segments):
+            for comp_idx, comp in enumerate(components):
+                amplitudes[row, seg_idx, comp_idx] = comp['amplitude']
+                freqs[row, seg_idx, comp_idx] = comp['freq']
+                phases[row, seg_idx, comp_idx] = comp.get('phase', 0.0)
+    return amplitudes, freqs, phases
+
+
+def _render_rows(amplitudes, freqs, phases, bounds, t, width, normalize):
+    """
+    Evalúa las filas empaquetadas por _pack_group sobre las primeras width muestras.
+
+    Retorna:
+    - Arreglo float32 (filas, width), normalizado por fila si normalize es True.
+    """
+    n_rows, _, n_components = amplitudes.shape
+    block = np.zeros((n_rows, width), dtype=np.float32)
+    arg = np.empty((n_rows, width))
+    wave = np.empty((n_rows, width), dtype=np.float32)
+
+    for seg_idx, (start_idx, end_idx, start_time) in enumerate(bounds):
+        if end_idx <= start_idx:
+            continue
+        t_segment = t[start_idx:end_idx] - start_time
+        length = end_idx - start_idx
+        for comp_idx in range(n_components):
+            amp = amplitudes[:, seg_idx, comp_idx]
+            if not np.any(amp):
+                continue
+            omega = 2 * np.pi * freqs[:, seg_idx, comp_idx]
+            seg_arg = arg[:, :length]
+            seg_wave = wave[:, :length]
+            np.multiply(omega[:, np.newaxis], t_segment[np.newaxis, :], out=seg_arg)
+            seg_arg += phases[:, seg_idx, comp_idx][:, np.newaxis]
+            np.cos(seg_arg, out=seg_wave)
+            seg_wave *= amp[:, np.newaxis].astype(np.float32)
+            block[:, start_idx:end_idx] += seg_wave
+
+    if normalize and width:
+        np.abs(block, out=wave)
+        peaks = np.max(wave, axis=1)
+        block /= np.where(peaks > 1e-8, peaks, 1.0).astype(np.float32)[:, np.newaxis]
+    return block
+
+
+@timed('signal.render_batch')
+def render_batch(specs, sample_rate=44100, duration_seg=5.0, max_memory_mb=DEFAULT_MAX_MEMORY_MB,
+                 out=None, normalize=True):
+    """
+    Renderiza un lote de señales en un único arreglo (N, muestras) de tipo float32.
+
+    Cada especificación es un diccionario con una de estas formas:
+    - {'components': [{'amplitude', 'freq', 'phase'}, ...]}: tono o acorde estacionario
+      (equivalente a Signal / CompositeSignal). Con la clave opcional 'period' ('auto' o
+      segundos, ver CompositeSignal) se evalúa un solo ciclo y se repite hasta completar la
+      duración.
+    - {'segments': [[{'amplitude', 'freq', 'phase'}, ...], ...], 'unit_time': float}:
+      señal rítmica (equivalente a RhythmSignal).
+
+    Las especificaciones se agrupan por unit_time y se evalúan de forma vectorizada sobre
+    bloques de filas, de modo que los temporales no superen max_memory_mb.
+
+    Parámetros:
+    - specs: Lista de especificaciones.
+    - sample_rate: Tasa de muestreo.
+    - duration_seg: Duración de cada señal en segundos.
+    - max_memory_mb: Presupuesto aproximado de memoria para los temporales de cada bloque.
+    - out: Arreglo float32 (N, muestras) preasignado opcional donde escribir el resultado.
+    - normalize: Si es True, normaliza cada fila a [-1, 1] como normalize_signal.
+
+    Retorna:
+    - El arreglo (N, muestras) con las señales renderizadas.
+    """
+    n_samples = int(sample_rate * duration_seg)
+    shape = (len(specs), n_samples)
+    if out is None:
+        out = np.zeros(shape, dtype=np.float32)
+    else:
+        if out.shape != shape or out.dtype != np.float32:
+            raise ValueError(f"El arreglo de salida debe ser float32 con forma {shape}.")
+        out.fill(0.0)
+
+    t = np.arange(n_samples) / sample_rate
+
+    # Agrupar por unit_time: dentro de un grupo los segmentos comparten índices
+    groups = {}
+    for row, spec in enumerate(specs):
+        segments, unit_time = _spec_segments(spec, sample_rate, duration_seg)
+        period = spec.get('period') if 'components' in spec else None
+        groups.setdefault((unit_time, period), []).append((row, segments))
+
+    # Temporales por fila: argumento float64 + coseno float32 + acumulador float32
+    bytes_per_row = n_samples * (8 + 4 + 4)
+    rows_per_chunk = max(1, int(max_memory_mb * 1024 * 1024 // bytes_per_row))
+
+    for (unit_time, period), members in groups.items():
+        n_segments = max(len(segments) for _, segments in members)
+        n_components = max((len(c) for _, segments in members for c in segments), default=0)
+        if n_components == 0:
+            continue
+        bounds = _segment_bounds(n_segments, unit_time, sample_rate, n_samples)
+
+        for chunk_start in range(0, len(members), rows_per_chunk):
+            chunk = members[chunk_start:chunk_start + rows_per_chunk]
+            rows = np.array([row for row, _ in chunk])
+            amplitudes, freqs, phases = _pack_group([segments for _, segments in chunk],
+                                                    n_segments, n_components)
+            # Señales estacionarias con periodo: cada fila usa su propio ciclo, de modo que su
+            # resultado no depende de las demás filas del bloque
+            if period is None:
+                lengths = [None] * len(chunk)
+            else:
+                lengths = [cycle_length(row_freqs.ravel(), 1 / sample_rate, period, max_length=n_samples)
+                           for row_freqs in freqs]
+
+            for length in dict.fromkeys(lengths):
+                selected = np.array([row_length == length for row_length in lengths])
+                sub_freqs = freqs[selected]
+                if length is not None and period != 'auto':
+                    sub_freqs = quantize_freqs(sub_freqs, 1 / sample_rate, length)
+                block = _render_rows(amplitudes[selected], sub_freqs, phases[selected],
+                                     bounds if length is None else [(0, length, 0.0)], t,
+                                     length or n_samples, normalize)
+                if length is None:
+                    out[rows[selected]] = block
+                else:
+                    for row, cycle in zip(rows[selected], block):
+                        tile_cycle(cycle, n_samples, out=out[row])
+
+    count('samples_rendered', out.size)
+    return out
+
+
+@timed('signal.superpose')
+def superpose(signals, groups, out=None):
+    """
+    Superpone en memoria filas de un lote ya renderizado, sin pasar por archivos WAV.
+
+    Parámetros:
+    - signals: Arreglo float32 (M, muestras), normalmente el resultado de render_batch.
+    - groups: Lista de listas de índices de fila; cada lista produce una señal superpuesta.
+    - out: Arreglo float32 (len(groups), muestras) preasignado opcional.
+
+    Retorna:
+    - Arreglo float32 (len(groups), muestras) con cada suma normalizada a [-1, 1].
+    """
+    shape = (len(groups), signals.shape[1])
+    if out is None:
+        out = np.empty(shape, dtype=np.float32)
+    elif out.shape != shape or out.dtype != np.float32:
+        raise ValueError(f"El arreglo de salida debe ser float32 con forma {shape}.")
+
+    for row, indices in enumerate(groups):
+        np.sum(signals[list(indices)], axis=0, out=out[row])
+        peak = np.max(np.abs(out[row])) if shape[1] else 0.0
+        if peak > 1e-8:
+            out[row] /= peak
+    return out
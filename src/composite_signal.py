@@ -1,67 +1,204 @@
 # composite_signal.py
 
-import numpy as np
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
-from .base_signal import BaseSignal
+import logging
+import numpy as np
+from .base_signal import BaseSignal, DEFAULT_BLOCK_SIZE, DEFAULT_DTYPE
+from .oscillators import tile_cycle
+from .instrumentation import timed, count
 from .utils import normalize_signal, analyze_components
 
+logger = logging.getLogger(__name__)
+
+# Número máximo de elementos (componentes × muestras) de la matriz temporal de build_signal
+MAX_BLOCK_ELEMENTS = 1 << 20
+
+
+class ComponentStore:
+    """
+    Almacén de componentes respaldado por arreglos contiguos de amplitud, frecuencia y fase.
+    Se comporta como una lista de diccionarios {'amplitude', 'freq', 'phase'} para el código
+    que itera sobre las componentes, pero build_signal trabaja directamente con los arreglos.
+    """
+    def __init__(self, capacity=8):
+        self._amplitudes = np.empty(capacity)
+        self._freqs = np.empty(capacity)
+        self._phases = np.empty(capacity)
+        self._size = 0
+
+    def append(self, amplitude, freq, phase=0.0):
+        if self._size == len(self._freqs):
+            # Duplicar la capacidad para que añadir sea O(1) amortizado
+            capacity = 2 * max(1, self._size)
+            for name in ('_amplitudes', '_freqs', '_phases'):
+                grown = np.empty(capacity)
+                grown[:self._size] = getattr(self, name)[:self._size]
+                setattr(self, name, grown)
+        self._amplitudes[self._size] = amplitude
+        self._freqs[self._size] = freq
+        self._phases[self._size] = phase
+        self._size += 1
+
+    @property
+    def amplitudes(self):
+        return self._amplitudes[:self._size]
+
+    @property
+    def freqs(self):
+        return self._freqs[:self._size]
+
+    @property
+    def phases(self):
+        return self._phases[:self._size]
+
+    def active(self):
+        """
+        Amplitudes, frecuencias y fases de las componentes con frecuencia distinta de cero.
+        """
+        mask = self.freqs != 0.0
+        return self.amplitudes[mask], self.freqs[mask], self.phases[mask]
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, idx):
+        if not -self._size <= idx < self._size:
+            raise IndexError("Índice de componente fuera de rango.")
+        idx %= self._size
+        return {'amplitude': float(self._amplitudes[idx]), 'freq': float(self._freqs[idx]),
+                'phase': float(self._phases[idx])}
+
+    def __iter__(self):
+        for idx in range(self._size):
+            yield self[idx]
+
+
 class CompositeSignal(BaseSignal):
-    def __init__(self, sample_rate=44100, duration_seg=5.0):  # Duración predeterminada 5.0
-        super().__init__(sample_rate, duration_seg)
-        self.components = []
-        self.signals = []  # Lista para almacenar señales individuales añadidas
+    def __init__(self, sample_rate=44100, duration_seg=5.0, oscillator='cos',
+                 dtype=DEFAULT_DTYPE, period=None):  # Duración predeterminada 5.0
+        super().__init__(sample_rate, duration_seg, oscillator, dtype, period)
+        self.components = ComponentStore()
+        self.added_signal = None  # Suma acumulada de las señales añadidas
+        self.num_signals = 0
+        self._added_peak = 0.0
 
     def add_component(self, amplitude, freq, phase=0.0):
         if freq > self.sample_rate / 2 and freq != 0.0:
-            print(f"Advertencia: la frecuencia {freq} Hz supera la mitad de la tasa de muestreo y puede causar aliasing.")
+            logger.warning('La frecuencia %s Hz supera la mitad de la tasa de muestreo y puede causar aliasing.', freq)
             return
-        self.components.append({'amplitude': amplitude, 'freq': freq, 'phase': phase})
+        self.components.append(amplitude, freq, phase)
 
     def add_signal(self, signal_instance):
         """
-        Añade una señal ya generada a la lista de señales para superposición.
+        Añade una señal ya generada para superposición, acumulándola en un único búfer en lugar
+        de conservar cada señal completa.
         """
         if signal_instance.signal is None:
             raise ValueError("La señal a añadir no ha sido generada.")
-        if len(signal_instance.signal) != len(self.t):
+        if len(signal_instance.signal) != self.num_samples:
             raise ValueError("La señal añadida no tiene la misma duración que la señal compuesta.")
-        self.signals.append(signal_instance.signal)
+        if self.added_signal is None:
+            self.added_signal = np.zeros(self.num_samples, dtype=self.dtype)
+        self.added_signal += signal_instance.signal
+        self._added_peak += np.max(np.abs(signal_instance.signal))
+        self.num_signals += 1
+
+    def _render_components(self, start, stop, out, freqs=None):
+        """
+        Acumula en out la suma de las componentes en las muestras [start, stop), evaluando
+        bloques de la matriz (componentes × muestras) y reduciéndolos con un producto matricial.
+        freqs sustituye a las frecuencias activas (p. ej. cuantizadas por _cycle_length).
+        """
+        amplitudes, active_freqs, phases = self.components.active()
+        freqs = active_freqs if freqs is None else freqs
+        if len(freqs) == 0:
+            return out
+        if self.oscillator != 'cos':
+            for amplitude, freq, phase in zip(amplitudes, freqs, phases):
+                out += amplitude * self._oscillate(freq, phase, start, stop)
+            return out
 
+        omega = 2 * np.pi * freqs
+        amplitudes = amplitudes.astype(self.dtype)
+        block_size = max(1, MAX_BLOCK_ELEMENTS // len(freqs))
+        waves = np.empty((len(freqs), min(block_size, stop - start)), dtype=self.dtype)
+        for block_start in range(start, stop, block_size):
+            block_stop = min(block_start + block_size, stop)
+            # El argumento se calcula en float64; el coseno se guarda directamente en self.dtype
+            arg = np.multiply.outer(omega, self._time_block(block_start, block_stop))
+            arg += phases[:, np.newaxis]
+            wave = waves[:, :block_stop - block_start]
+            np.cos(arg, out=wave)
+            out[block_start - start:block_stop - start] += amplitudes @ wave
+        return out
+
+    @timed('signal.build')
     def build_signal(self):
-        if not self.components and not self.signals:
+        if not len(self.components) and self.added_signal is None:
             raise RuntimeError("No hay componentes ni señales para construir la señal compuesta.")
 
-        composite_signal = np.zeros_like(self.t)
+        composite_signal = np.zeros(self.num_samples, dtype=self.dtype)
+        length, freqs = self._cycle_length(self.components.active()[1])
+        self._cycle = None
 
-        # Añadir componentes individuales
-        for comp in self.components:
-            amplitude = comp['amplitude']
-            freq = comp['freq']
-            phase = comp['phase']
-            if freq == 0.0:
-                continue  # Placeholder, ya manejamos superposición manualmente
-            composite_signal += amplitude * np.cos(2 * np.pi * freq * self.t + phase)
+        # Añadir componentes individuales (las de frecuencia 0.0 son placeholders)
+        if length is None:
+            self._render_components(0, self.num_samples, composite_signal)
+        else:
+            cycle = self._render_components(0, length, np.zeros(length, dtype=self.dtype), freqs=freqs)
+            if self.added_signal is None:
+                # Señal periódica: basta con normalizar el ciclo (contiene todos los valores)
+                normalize_signal(cycle, inplace=True)
+                self.signal = tile_cycle(cycle, self.num_samples, out=composite_signal)
+                self._cycle = self.signal[:length]
+            else:
+                tile_cycle(cycle, self.num_samples, out=composite_signal)
 
-        # Añadir señales superpuestas
-        if self.signals:
-            composite_signal += np.sum(self.signals, axis=0)
+        if self._cycle is None:
+            # Añadir señales superpuestas
+            if self.added_signal is not None:
+                composite_signal += self.added_signal
+            self.signal = normalize_signal(composite_signal, inplace=True)
+        count('samples_rendered', len(self.signal))
+        logger.info('Señal compuesta generada con %d componentes y %d señales añadidas.', len(self.components),
+                    self.num_signals)
 
-        self.signal = normalize_signal(composite_signal)
-        print(f'Señal compuesta generada con {len(self.components)} componentes y {len(self.signals)} señales añadidas.')
+    def iter_blocks(self, block_size=DEFAULT_BLOCK_SIZE):
+        if not len(self.components) and self.added_signal is None:
+            raise RuntimeError("No hay componentes ni señales para construir la señal compuesta.")
+
+        length, freqs = self._cycle_length(self.components.active()[1])
+        if length is not None:
+            # Los mismos bloques que build_signal: copias del ciclo con frecuencias cuantizadas
+            cycle = self._render_components(0, length, np.zeros(length, dtype=self.dtype), freqs=freqs)
+        for start in range(0, self.num_samples, block_size):
+            stop = min(start + block_size, self.num_samples)
+            if length is None:
+                block = self._render_components(start, stop, np.zeros(stop - start, dtype=self.dtype))
+            else:
+                block = cycle.take(np.arange(start, stop), mode='wrap')
+            if self.added_signal is not None:
+                block += self.added_signal[start:stop]
+            yield block
 
+    def predicted_peak(self):
+        amplitudes, _, _ = self.components.active()
+        return float(np.sum(np.abs(amplitudes))) + self._added_peak
 
     def analyze_components(self):
         analyze_components(self.components)
 
+    @timed('plot.signal')
     def plot_signal(self, show=True, save_path=None):
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
         if self.signal is None:
-            print("No se ha generado la señal compuesta.")
+            logger.warning("No se ha generado la señal compuesta.")
             return
 
         plt.figure(figsize=(10, 6))
-        min_freq = min([comp['freq'] for comp in self.components if comp['freq'] != 0.0], default=1)
+        min_freq = min(self.components.active()[1], default=1)
         period = 1 / min_freq
         max_plot_time = 4 * period
         max_plot_samples = int(max_plot_time * self.sample_rate)
@@ -73,22 +210,21 @@ class CompositeSignal(BaseSignal):
 
         sns.lineplot(x=x_values, y=signal_interval, label='Señal compuesta', color='black')
 
-        # Graficar componentes individuales
-        for idx, comp in enumerate(self.components):
-            amplitude = comp['amplitude']
-            freq = comp['freq']
-            phase = comp['phase']
+        # Graficar componentes individuales, evaluadas todas a la vez
+        store = self.components
+        individual_signals = store.amplitudes[:, np.newaxis] * np.cos(
+            2 * np.pi * np.multiply.outer(store.freqs, t_interval) + store.phases[:, np.newaxis])
+        for idx, (freq, individual_signal) in enumerate(zip(store.freqs, individual_signals)):
             if freq == 0.0:
                 continue  # Placeholder, ya manejamos superposición manualmente
-            individual_signal = amplitude * np.cos(2 * np.pi * freq * t_interval + phase)
             sns.lineplot(x=x_values, y=individual_signal, label=f'Componente {idx + 1}: {freq:.2f} Hz')
 
-        # Graficar señales añadidas
-        for idx, sig in enumerate(self.signals):
-            individual_signal = sig[:max_plot_samples]
-            sns.lineplot(x=x_values, y=individual_signal, label=f'Señal añadida {idx + 1}', linestyle='--')
+        # Graficar la suma de las señales añadidas
+        if self.added_signal is not None:
+            sns.lineplot(x=x_values, y=self.added_signal[:max_plot_samples],
+                         label=f'Señales añadidas ({self.num_signals})', linestyle='--')
 
-        plt.title(f'Señal compuesta con {len(self.components)} componentes y {len(self.signals)} señales añadidas')
+        plt.title(f'Señal compuesta con {len(self.components)} componentes y {self.num_signals} señales añadidas')
         plt.xlabel('ωt / π')
         plt.xticks(ticks=np.linspace(0, 8, 9), labels=[f'{i}π/4' for i in range(9)])
         plt.ylabel('Amplitud')
@@ -100,7 +236,7 @@ class CompositeSignal(BaseSignal):
             if directory and not os.path.exists(directory):
                 os.makedirs(directory)
             plt.savefig(save_path)
-            print(f'Gráfica guardada en {save_path}')
+            logger.info('Gráfica guardada en %s', save_path)
         if show:
             plt.show()
         plt.close()
@@ -110,16 +246,21 @@ class CompositeSignal(BaseSignal):
         if self.signal is None:
             raise RuntimeError("No se ha generado la señal compuesta.")
 
-        # Preparar metadatos
+        # Preparar metadatos. Con un periodo forzado las frecuencias sintetizadas son las
+        # cuantizadas (rendered_freq), no las pedidas; los placeholders (0.0) no se sintetizan
+        _, rendered = self._cycle_length(self.components.active()[1])
+        rendered = iter(rendered)
         metadata = {
             'components': [
                 {
                     'amplitude': comp['amplitude'],
                     'freq': comp['freq'],
+                    'rendered_freq': float(next(rendered)) if comp['freq'] != 0.0 else 0.0,
                     'phase': comp['phase']
                 } for comp in self.components
             ],
-            'num_signals_added': len(self.signals),
+            'period': self.period,
+            'num_signals_added': self.num_signals,
             'sample_rate': self.sample_rate,
             'duration_seg': self.duration_seg
         }
@@ -0,0 +1,504 @@
+# dataset_generator.py
+
+import os
+import re
+import random
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .batch_signal import render_batch, superpose
+from .audio_io import atomic_path, write_wav
+from .features import feature_config, feature_key, save_features
+from .instrumentation import METRICS, timed
+from .manifest import Manifest, content_hash
+from .utils import calculate_note_frequencies, normalize_signal
+
+logger = logging.getLogger(__name__)
+
+# Parámetros
+SAMPLE_RATE = 44100
+DURATION_SEG = 5.0
+AMPLITUDE = 1.0
+PHASE = 0.0
+OCTAVE_RANGE = (3, 5)  # Rango de octavas ajustado a frecuencias audibles
+REF_FREQ = 440.0
+
+# Tonalidades usadas para acordes, melodías y progresiones
+TONALIDADES = ['C', 'G', 'D', 'A', 'E', 'F', 'B']
+MELODY_SCALES = ['major', 'minor_natural', 'dorian', 'mixolydian', 'lydian']
+PROGRESSION_SCALES = ['major', 'minor_natural']
+
+# Clases del conjunto de datos, en el orden en que se generan
+CLASSES = ['tones', 'chords', 'melodies', 'chord_melodies', 'superposed']
+
+# Definir intervalos de escalas y modos
+SCALES = {
+    'major': [0, 2, 4, 5, 7, 9, 11],
+    'minor_natural': [0, 2, 3, 5, 7, 8, 10],
+    'dorian': [0, 2, 3, 5, 7, 9, 10],
+    'phrygian': [0, 1, 3, 5, 7, 8, 10],
+    'lydian': [0, 2, 4, 6, 7, 9, 11],
+    'mixolydian': [0, 2, 4, 5, 7, 9, 10],
+    'locrian': [0, 1, 3, 5, 6, 8, 10],
+    'pentatonic_major': [0, 2, 4, 7, 9],
+    'pentatonic_minor': [0, 3, 5, 7, 10],
+    'blues': [0, 3, 5, 6, 7, 10],
+}
+
+# Mapas auxiliares para calcular las notas
+SEMITONE_NOTES = {
+    0: 'C', 1: 'C#', 2: 'D', 3: 'D#', 4: 'E', 5: 'F', 6: 'F#', 7: 'G',
+    8: 'G#', 9: 'A', 10: 'A#', 11: 'B'
+}
+NOTE_SEMITONES = {v: k for k, v in SEMITONE_NOTES.items()}
+
+# Número de tareas que un proceso renderiza de una vez. Es fijo e independiente del
+# número de procesos, para que la partición del trabajo (y por tanto la salida) no cambie.
+CHUNK_SIZE = 16
+
+
+def get_scale_notes(tonic, scale_name, note_frequencies, octave_range=OCTAVE_RANGE):
+    """
+    Genera una lista de notas pertenecientes a la escala dada a partir de la tónica.
+    """
+    intervals = SCALES.get(scale_name)
+    if not intervals:
+        logger.warning('Escala %s no definida.', scale_name)
+        return []
+
+    if tonic not in NOTE_SEMITONES:
+        logger.warning('Tónica %s no válida.', tonic)
+        return []
+
+    tonic_semitone = NOTE_SEMITONES[tonic]
+
+    # Generar las notas de la escala en todas las octavas
+    scale_notes = []
+    for octave in range(octave_range[0], octave_range[1] + 1):
+        for interval in intervals:
+            note_semitone = (tonic_semitone + interval) % 12
+            note = f"{SEMITONE_NOTES[note_semitone]}{octave}"
+            if note in note_frequencies:
+                scale_notes.append(note)
+    return scale_notes
+
+
+def get_note_octave(note):
+    match = re.match(r'^([A-G]#?)(\d+)$', note)
+    if match:
+        return int(match.group(2))
+    return None
+
+
+def generate_diatonic_chords(tonic, scale_name, note_frequencies, octave_range=OCTAVE_RANGE):
+    """
+    Genera acordes diatónicos (triadas I, III, V) para la tonalidad y escala dada.
+    """
+    scale_notes = get_scale_notes(tonic, scale_name, note_frequencies, octave_range)
+    if not scale_notes:
+        return {}
+
+    chords = {}
+    for i in range(len(scale_notes)):
+        chord_notes = [scale_notes[(i + j) % len(scale_notes)] for j in [0, 2, 4]]
+        chords[f"{tonic}_{scale_name}_Chord_{i+1}"] = chord_notes
+    return chords
+
+
+def task_seed(master_seed, key):
+    """
+    Deriva la semilla de una tarea a partir de la semilla maestra y de su clave estable.
+
+    La semilla depende solo de la identidad de la tarea (no de su posición en la lista),
+    así que es la misma sin importar cuántos procesos participen o en qué orden se ejecuten.
+    """
+    digest = hashlib.sha256(key.encode('utf-8')).digest()
+    words = np.frombuffer(digest[:16], dtype=np.uint32).tolist()
+    return int(np.random.SeedSequence([master_seed, *words]).generate_state(1, dtype=np.uint64)[0])
+
+
+def _with_period(spec, period):
+    if period is not None:
+        spec['period'] = period
+    return spec
+
+
+def tone_spec(note, note_frequencies, amplitude=AMPLITUDE, phase=PHASE, period=None):
+    """
+    Especificación de renderizado de un tono simple. period se guarda en la especificación
+    si no es None (ver render_batch).
+    """
+    freq = note_frequencies.get(note)
+    if not freq:
+        logger.warning('Frecuencia para la nota %s no encontrada.', note)
+        return None
+    return _with_period({'components': [{'amplitude': amplitude, 'freq': float(freq), 'phase': phase}],
+                         'labels': [note]}, period)
+
+
+def chord_spec(notes, note_frequencies, amplitude=AMPLITUDE, phase=PHASE, period=None):
+    """
+    Especificación de renderizado de un acorde a partir de una lista de notas.
+    """
+    components = []
+    for note in notes:
+        freq = note_frequencies.get(note)
+        if freq:
+            components.append({'amplitude': amplitude, 'freq': float(freq), 'phase': phase})
+        else:
+            logger.warning('Frecuencia para la nota %s no encontrada.', note)
+    return _with_period({'components': components, 'labels': list(notes)}, period)
+
+
+def melody_spec(tonic, scale_name, note_frequencies, rng, num_notes=16, amplitude=AMPLITUDE,
+                phase=PHASE, duration=DURATION_SEG, octave_range=OCTAVE_RANGE):
+    """
+    Especificación de una melodía aleatoria basada en la escala y tonalidad dadas.
+
+    Parámetros:
+    - rng: Instancia de random.Random propia de la tarea.
+    """
+    scale_notes = get_scale_notes(tonic, scale_name, note_frequencies, octave_range)
+    if not scale_notes:
+        return None
+
+    # Seleccionar un rango de octavas para la melodía
+    available_octaves = range(octave_range[0], octave_range[1] + 1)
+    melody_octaves = rng.sample(list(available_octaves), k=min(2, len(available_octaves)))
+    melody_notes = [note for note in scale_notes if get_note_octave(note) in melody_octaves]
+
+    segments = []
+    labels = []
+    for _ in range(num_notes):
+        note = rng.choice(melody_notes)
+        segments.append([{'amplitude': amplitude, 'freq': float(note_frequencies[note]), 'phase': phase}])
+        labels.append(note)
+    return {'segments': segments, 'unit_time': duration / num_notes, 'labels': labels}
+
+
+def chord_progression_spec(tonic, scale_name, note_frequencies, rng, progression=None, num_chords=8,
+                           amplitude=AMPLITUDE, phase=PHASE, duration=DURATION_SEG,
+                           octave_range=OCTAVE_RANGE):
+    """
+    Especificación de una progresión de acordes basada en la escala y tonalidad dadas.
+
+    Parámetros:
+    - rng: Instancia de random.Random propia de la tarea.
+    - progression: Lista de grados (1..n). Si es None se genera una aleatoria.
+    """
+    chords = generate_diatonic_chords(tonic, scale_name, note_frequencies, octave_range)
+    if not chords:
+        return None
+
+    if progression is None:
+        chord_indices = list(range(1, len(chords) + 1))
+        progression = [rng.choice(chord_indices) for _ in range(num_chords)]
+    else:
+        # Validar que los índices de la progresión estén en el rango correcto
+        progression = [i if 1 <= i <= len(chords) else 1 for i in progression]
+
+    chord_names = list(chords.keys())
+    segments = []
+    labels = []
+    for idx in progression:
+        chord_name = chord_names[idx - 1]
+        segments.append(chord_spec(chords[chord_name], note_frequencies, amplitude, phase)['components'])
+        labels.append(chord_name)
+    return {'segments': segments, 'unit_time': duration / len(progression), 'labels': labels}
+
+
+def plan_dataset(note_frequencies, master_seed=0, tonalidades=TONALIDADES, melody_scales=MELODY_SCALES,
+                 progression_scales=PROGRESSION_SCALES, melodies_per_scale=5, progressions_per_scale=5,
+                 num_superposed=50, octave_range=OCTAVE_RANGE, duration=DURATION_SEG, period=None):
+    """
+    Construye la lista de etapas del conjunto de datos. Cada etapa es una lista de tareas
+    independientes; cada tarea lleva su clave, su ruta relativa, su semilla y la
+    especificación completa de lo que debe renderizar. Las superpuestas llevan las
+    especificaciones de sus fuentes y se mezclan en memoria, sin leer los WAV de otras etapas.
+
+    Con period (segundos o 'auto') los tonos y acordes se renderizan repitiendo un ciclo;
+    forma parte de su especificación, así que el manifiesto y la caché de características
+    los distinguen de los generados sin periodo.
+
+    Toda la aleatoriedad se resuelve aquí, con un random.Random por tarea, de modo que
+    los procesos solo ejecutan trabajo determinista.
+    """
+    def make_task(kind, name, **params):
+        key = f'{kind}/{name}'
+        return {'key': key, 'kind': kind, 'path': os.path.join(kind, f'{name}.wav'),
+                'seed': task_seed(master_seed, key), **params}
+
+    tones = []
+    for note in note_frequencies.keys():
+        spec = tone_spec(note, note_frequencies, period=period)
+        if spec:
+            tones.append(make_task('tones', note, spec=spec))
+
+    chords = []
+    for tonic in tonalidades:
+        for chord_name, notes in generate_diatonic_chords(tonic, 'major', note_frequencies, octave_range).items():
+            chords.append(make_task('chords', chord_name, spec=chord_spec(notes, note_frequencies, period=period)))
+
+    melodies = []
+    for tonic in tonalidades:
+        for scale_name in melody_scales:
+            for i in range(melodies_per_scale):
+                task = make_task('melodies', f'melody_{tonic}_{scale_name}_{i:04d}')
+                spec = melody_spec(tonic, scale_name, note_frequencies, random.Random(task['seed']),
+                                   duration=duration, octave_range=octave_range)
+                if spec:
+                    melodies.append(dict(task, spec=spec))
+
+    progressions = []
+    for tonic in tonalidades:
+        for scale_name in progression_scales:
+            for i in range(progressions_per_scale):
+                task = make_task('chord_melodies', f'chord_melody_{tonic}_{scale_name}_{i:04d}')
+                spec = chord_progression_spec(tonic, scale_name, note_frequencies, random.Random(task['seed']),
+                                              duration=duration, octave_range=octave_range)
+                if spec:
+                    progressions.append(dict(task, spec=spec))
+
+    superposed = []
+    if melodies and progressions:
+        for i in range(num_superposed):
+            task = make_task('superposed', f'superposed_{i:04d}')
+            rng = random.Random(task['seed'])
+            melody = rng.choice(melodies)
+            chord_melody = rng.choice(progressions)
+            # Las fuentes viajan con su especificación para volver a renderizarlas en memoria
+            superposed.append(dict(task, sources=[melody['path'], chord_melody['path']],
+                                   source_specs=[melody['spec'], chord_melody['spec']]))
+
+    return [tones, chords, melodies, progressions, superposed]
+
+
+def _task_metadata(task, sample_rate, duration):
+    metadata = {'key': task['key'], 'seed': task['seed'], 'sample_rate': sample_rate, 'duration_seg': duration}
+    if 'spec' in task:
+        metadata.update(task['spec'])
+    if 'sources' in task:
+        metadata['sources'] = task['sources']
+    return metadata
+
+
+def _save_spectrogram(signal, sample_rate, wav_path):
+    from .viz import plot_spectrogram
+
+    spectrogram_path = wav_path.replace('.wav', '_spectrogram.png')
+    with atomic_path(spectrogram_path) as tmp_path:
+        plot_spectrogram(signal, sample_rate, save_path=tmp_path)
+    return spectrogram_path
+
+
+def _feature_params(task, sample_rate, duration):
+    """
+    Parámetros que identifican la señal de una tarea para la caché de características.
+    """
+    params = {'sample_rate': sample_rate, 'duration_seg': duration}
+    if 'spec' in task:
+        params['spec'] = {k: v for k, v in task['spec'].items() if k != 'labels'}
+    if 'source_specs' in task:
+        params['sources'] = [{k: v for k, v in spec.items() if k != 'labels'} for spec in task['source_specs']]
+    return params
+
+
+def _task_outputs(task, sample_rate, duration, spectrograms, features):
+    """
+    Rutas (relativas al directorio de datos) de los archivos que produce una tarea.
+    """
+    wav_path = task['path']
+    outputs = [wav_path, wav_path.replace('.wav', '_metadata.json')]
+    if spectrograms:
+        outputs.append(wav_path.replace('.wav', '_spectrogram.png'))
+    if features:
+        key = feature_key(_feature_params(task, sample_rate, duration), features)
+        outputs.append(os.path.join('features', task['kind'], f'{key}.npz'))
+    return outputs
+
+
+def _task_hash(task, sample_rate, duration):
+    """
+    Hash de todo lo que determina los archivos de una tarea. Las superpuestas incluyen la
+    especificación de sus fuentes, de modo que se reconstruyen cuando cambia alguna de ellas.
+    """
+    payload = {'metadata': _task_metadata(task, sample_rate, duration)}
+    if 'source_specs' in task:
+        payload['sources'] = task['source_specs']
+    return content_hash(payload)
+
+
+def _remove_outputs(output_dir, paths):
+    for path in paths:
+        full_path = os.path.join(output_dir, path)
+        if os.path.exists(full_path):
+            os.remove(full_path)
+
+
+def _write_outputs(task, signal, output_dir, sample_rate, duration, spectrograms, features):
+    wav_path = os.path.join(output_dir, task['path'])
+    write_wav(wav_path, signal, sample_rate, metadata=_task_metadata(task, sample_rate, duration))
+    signal = normalize_signal(signal, inplace=True)
+    if spectrograms:
+        _save_spectrogram(signal, sample_rate, wav_path)
+    if features:
+        save_features(signal, sample_rate, _feature_params(task, sample_rate, duration),
+                      os.path.join(output_dir, 'features', task['kind']), config=features)
+
+
+@timed('dataset.chunk')
+def _run_chunk(chunk, output_dir, sample_rate, duration, spectrograms, features):
+    """
+    Ejecuta un bloque de tareas en el proceso actual.
+
+    Parámetros:
+    - features: Configuración de extracción de características, o None para no extraerlas.
+
+    Retorna:
+    - Lista de (clave, rutas escritas) por tarea, en el orden del bloque.
+    """
+    written = []
+    renderable = [task for task in chunk if 'spec' in task]
+    mixes = [task for task in chunk if 'source_specs' in task]
+
+    # Un único lote con las señales propias y las fuentes de las superpuestas
+    specs = [task['spec'] for task in renderable]
+    groups = []
+    for task in mixes:
+        groups.append(range(len(specs), len(specs) + len(task['source_specs'])))
+        specs.extend(task['source_specs'])
+    if not specs:
+        return written
+    signals = render_batch(specs, sample_rate=sample_rate, duration_seg=duration)
+
+    for task, signal in zip(renderable, signals):
+        _write_outputs(task, signal, output_dir, sample_rate, duration, spectrograms, features)
+        written.append((task['key'], _task_outputs(task, sample_rate, duration, spectrograms, features)))
+
+    if mixes:
+        for task, signal in zip(mixes, superpose(signals, groups)):
+            _write_outputs(task, signal, output_dir, sample_rate, duration, spectrograms, features)
+            written.append((task['key'], _task_outputs(task, sample_rate, duration, spectrograms, features)))
+
+    return written
+
+
+def _run_chunk_in_worker(chunk, *args):
+    """
+    _run_chunk en un proceso del pool: retorna también las métricas de instrumentación del
+    bloque para que el proceso principal las acumule.
+    """
+    METRICS.reset()
+    return _run_chunk(chunk, *args), METRICS.snapshot()
+
+
+def _merge_worker_result(written, snapshot):
+    METRICS.merge(snapshot)
+    return written
+
+
+def generate_dataset(output_dir, note_frequencies=None, master_seed=0, num_workers=1,
+                     sample_rate=SAMPLE_RATE, duration=DURATION_SEG, spectrograms=True,
+                     features=False, feature_dtype='float16', chunk_size=CHUNK_SIZE, force=False, prune=False,
+                     **plan_kwargs):
+    """
+    Genera tonos, acordes, melodías, progresiones de acordes y señales superpuestas.
+
+    El trabajo se divide en etapas (una por clase) y cada etapa en bloques de tamaño fijo
+    que se reparten entre num_workers procesos. Cada tarea tiene su propia ruta de salida y
+    su propia semilla derivada de master_seed, y todos los archivos se escriben de forma
+    atómica, así que el resultado es idéntico byte a byte con cualquier número de procesos.
+
+    La construcción es incremental: output_dir/manifest.sqlite guarda el hash de cada tarea
+    (especificación, semilla, parámetros de audio y, en las superpuestas, la especificación
+    de sus fuentes) y sus archivos. Las tareas con el mismo hash y todos sus archivos en disco se
+    omiten, así que al cambiar p. ej. la lista de escalas solo se renderiza lo que cambió.
+
+    Parámetros:
+    - output_dir: Directorio raíz de los datos (se crea una carpeta por clase).
+    - note_frequencies: Diccionario de notas y frecuencias. Si es None se calcula con OCTAVE_RANGE.
+    - master_seed: Semilla maestra de la que se derivan todas las semillas de las tareas.
+    - num_workers: Número de procesos. Con 1 se ejecuta en el proceso actual.
+    - sample_rate: Tasa de muestreo.
+    - duration: Duración de cada señal en segundos.
+    - spectrograms: Si es True, guarda el espectrograma PNG de cada señal.
+    - features: Si es True, guarda espectrograma y chromagram como .npz en output_dir/features,
+      con nombre según la clave de sus parámetros (los ya existentes no se recalculan).
+    - feature_dtype: Tipo de dato de las características guardadas ('float16' o 'float32').
+    - chunk_size: Número de tareas por bloque de trabajo.
+    - force: Si es True reconstruye todas las tareas aunque estén al día.
+    - prune: Si es True elimina los archivos y entradas del manifiesto de las tareas que ya no
+      están en el plan. Los archivos de versiones anteriores de tareas reconstruidas se
+      eliminan siempre.
+    - plan_kwargs: Argumentos adicionales para plan_dataset.
+
+    Retorna:
+    - Lista de rutas (relativas a output_dir) de los WAV del conjunto, en orden de planificación.
+    """
+    if note_frequencies is None:
+        note_frequencies = calculate_note_frequencies(octave_range=OCTAVE_RANGE, ref_freq=REF_FREQ)
+
+    stages = plan_dataset(note_frequencies, master_seed=master_seed, duration=duration, **plan_kwargs)
+    for cls_name in CLASSES:
+        os.makedirs(os.path.join(output_dir, cls_name), exist_ok=True)
+
+    feature_cfg = feature_config(dtype=feature_dtype) if features else None
+    args = (output_dir, sample_rate, duration, spectrograms, feature_cfg)
+    planned = {}  # Clave -> entrada del manifiesto de todas las tareas del plan
+    superseded = set()  # Archivos de versiones anteriores de tareas reconstruidas
+    written = []
+    built = 0
+
+    manifest = Manifest(output_dir)
+    executor = ProcessPoolExecutor(max_workers=num_workers) if num_workers > 1 else None
+    try:
+        for cls_name, tasks in zip(CLASSES, stages):
+            pending = []
+            for task in tasks:
+                hash_value = _task_hash(task, sample_rate, duration)
+                outputs = _task_outputs(task, sample_rate, duration, spectrograms, feature_cfg)
+                planned[task['key']] = {'key': task['key'], 'kind': task['kind'], 'hash': hash_value,
+                                        'spec': _task_metadata(task, sample_rate, duration), 'outputs': outputs}
+                written.append(task['path'])
+                if force or not manifest.is_current(task['key'], hash_value, outputs):
+                    pending.append(task)
+
+            logger.info('Generando %s (%d de %d tareas, %d al día)...', cls_name, len(pending), len(tasks),
+                        len(tasks) - len(pending))
+            chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+            if executor is None:
+                results = (_run_chunk(chunk, *args) for chunk in chunks)
+            else:
+                futures = [executor.submit(_run_chunk_in_worker, chunk, *args) for chunk in chunks]
+                results = (_merge_worker_result(*future.result()) for future in futures)
+            for chunk_result in results:
+                # Registrar cada bloque en cuanto termina, para no perderlo si el proceso se interrumpe
+                entries = []
+                for key, _ in chunk_result:
+                    previous = manifest.get(key)
+                    if previous:
+                        superseded.update(previous['outputs'])
+                    entries.append(planned[key])
+                manifest.record(entries)
+                built += len(entries)
+
+        if prune:
+            obsolete = [key for key in manifest.keys() if key not in planned]
+            for key in obsolete:
+                superseded.update(manifest.get(key)['outputs'])
+            manifest.remove(obsolete)
+        # Los archivos de versiones anteriores se eliminan siempre, salvo los que sigue usando
+        # alguna tarea del plan o del manifiesto (sin prune se conservan las que salieron del plan)
+        referenced = {path for entry in planned.values() for path in entry['outputs']}
+        for key in manifest.keys():
+            if key not in planned:
+                referenced.update(manifest.get(key)['outputs'])
+        _remove_outputs(output_dir, sorted(superseded - referenced))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        manifest.close()
+
+    logger.info('Conjunto de datos generado en %s: %d señales (%d construidas).', output_dir, len(written), built)
+    return written
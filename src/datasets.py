@@ -0,0 +1,270 @@
+# datasets.py
+
+import os
+import json
+import random
+import numpy as np
+import torch
+from torch.utils.data import Dataset, IterableDataset, get_worker_info
+from .batch_signal import render_batch, superpose
+from .dataset_generator import (CLASSES, TONALIDADES, MELODY_SCALES, PROGRESSION_SCALES, OCTAVE_RANGE,
+                                REF_FREQ, SAMPLE_RATE, DURATION_SEG, tone_spec, chord_spec, melody_spec,
+                                chord_progression_spec, generate_diatonic_chords)
+from .feature_engine import get_engine, to_model_input_batch
+from .utils import calculate_note_frequencies
+
+# Archivos de un directorio de shards (ver shards.pack_shards)
+INDEX_FILENAME = 'index.json'
+LABELS_FILENAME = 'labels.npy'
+
+
+def to_model_input(features, size=(128, 128), channels=3):
+    """
+    Convierte una matriz de características (frecuencias, tiempos) en un tensor de tamaño
+    fijo (channels, *size) apto para CNN_LSTM: la frecuencia más baja queda abajo como en
+    los espectrogramas PNG, se estandariza y se replica en los canales.
+
+    Parámetros:
+    - features: Matriz 2D (NumPy o tensor).
+    - size: Tamaño de salida (alto, ancho).
+    - channels: Número de canales de salida.
+    """
+    x = torch.as_tensor(np.asarray(features, dtype=np.float32))
+    return to_model_input_batch(x[None], size=size, channels=channels)[0]
+
+
+class SpectrogramImageDataset(Dataset):
+    """
+    Dataset de los espectrogramas PNG de generate_dataset (el AudioDataset de NN.ipynb).
+    Cada imagen se redimensiona con interpolación bilineal y se normaliza a [-1, 1] como
+    Resize + ToTensor + Normalize(0.5, 0.5) de torchvision.
+    """
+    def __init__(self, data_dir, size=(128, 128), transform=None):
+        self.data_dir = data_dir  # Directorio raíz de los datos
+        self.size = size
+        self.transform = transform
+        self.samples = []
+        self.labels = []
+
+        self.classes = CLASSES
+        self.class_to_idx = {cls_name: idx for idx, cls_name in enumerate(self.classes)}
+
+        self._load_data()
+
+    def _load_data(self):
+        for cls_name in self.classes:
+            cls_dir = os.path.join(self.data_dir, cls_name)
+            if not os.path.isdir(cls_dir):
+                continue
+            for filename in sorted(os.listdir(cls_dir)):
+                if filename.endswith('_spectrogram.png'):
+                    self.samples.append(os.path.join(cls_dir, filename))
+                    self.labels.append(self.class_to_idx[cls_name])
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, idx):
+        from PIL import Image
+
+        with Image.open(self.samples[idx]) as image:
+            image = image.convert('RGB').resize((self.size[1], self.size[0]), Image.BILINEAR)
+        x = torch.from_numpy(np.asarray(image, dtype=np.float32).transpose(2, 0, 1) / 127.5 - 1.0)
+        if self.transform:
+            x = self.transform(x)
+        return x, self.labels[idx]
+
+
+class FeatureDataset(Dataset):
+    """
+    Dataset de características precalculadas (.npz de save_features) organizadas en una
+    carpeta por clase, sin decodificar imágenes.
+    """
+    def __init__(self, data_dir, feature='spectrogram', size=(128, 128), channels=3, transform=None):
+        self.data_dir = data_dir  # Directorio raíz de las características
+        self.feature = feature  # 'spectrogram' o 'chroma'
+        self.size = size
+        self.channels = channels
+        self.transform = transform
+        self.samples = []
+        self.labels = []
+
+        self.classes = CLASSES
+        self.class_to_idx = {cls_name: idx for idx, cls_name in enumerate(self.classes)}
+
+        self._load_data()
+
+    def _load_data(self):
+        for cls_name in self.classes:
+            cls_dir = os.path.join(self.data_dir, cls_name)
+            if not os.path.isdir(cls_dir):
+                continue
+            for filename in sorted(os.listdir(cls_dir)):
+                if filename.endswith('.npz'):
+                    self.samples.append(os.path.join(cls_dir, filename))
+                    self.labels.append(self.class_to_idx[cls_name])
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, idx):
+        with np.load(self.samples[idx]) as data:
+            features = data[self.feature]
+        x = to_model_input(features, size=self.size, channels=self.channels)
+        if self.transform:
+            x = self.transform(x)
+        return x, self.labels[idx]
+
+
+class ShardedDataset(Dataset):
+    """
+    Dataset sobre los shards escritos por shards.pack_shards.
+
+    Los shards se abren con np.load(mmap_mode='c') de forma perezosa en cada proceso, así
+    que los workers de DataLoader comparten las páginas del archivo en lugar de decodificar
+    imágenes. Con shards float32 cada ejemplo es una vista sin copia del mapa en memoria.
+    """
+    def __init__(self, shard_dir, channels=3, transform=None):
+        self.shard_dir = shard_dir
+        self.channels = channels
+        self.transform = transform
+
+        with open(os.path.join(shard_dir, INDEX_FILENAME)) as f:
+            self.index = json.load(f)
+        self.classes = self.index['classes']
+        self.class_to_idx = {cls_name: idx for idx, cls_name in enumerate(self.classes)}
+        self.labels = np.load(os.path.join(shard_dir, LABELS_FILENAME))
+        self._shard_of = np.array([s['shard'] for s in self.index['samples']], dtype=np.int64)
+        self._row_of = np.array([s['row'] for s in self.index['samples']], dtype=np.int64)
+        self._shards = None  # Se abren en el primer acceso de cada proceso
+
+    def _open_shards(self):
+        # 'c' (copy-on-write) da arreglos escribibles para torch.from_numpy sin copiar el archivo
+        self._shards = [np.load(os.path.join(self.shard_dir, shard['file']), mmap_mode='c')
+                        for shard in self.index['shards']]
+
+    def __getstate__(self):
+        # No serializar los mapas abiertos al enviar el dataset a los workers
+        state = self.__dict__.copy()
+        state['_shards'] = None
+        return state
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, idx):
+        if self._shards is None:
+            self._open_shards()
+        example = self._shards[self._shard_of[idx]][self._row_of[idx]]
+        x = torch.from_numpy(example)
+        if x.dtype != torch.float32:
+            x = x.float()
+        x = x.expand(self.channels, *x.shape)
+        if self.transform:
+            x = self.transform(x)
+        return x, int(self.labels[idx])
+
+
+class SyntheticDataset(IterableDataset):
+    """
+    Dataset infinito (o de tamaño fijo por época) que sintetiza los ejemplos dentro de los
+    workers de DataLoader y calcula sus características en memoria, sin escribir WAV ni PNG.
+
+    Cada worker usa su propio random.Random, derivado de (seed, época, id del worker),
+    renderiza render_size señales de una vez con render_batch y extrae sus características
+    en un solo lote con FeatureEngine.
+    """
+    def __init__(self, samples_per_epoch=None, seed=0, feature='spectrogram', size=(128, 128), channels=3,
+                 sample_rate=SAMPLE_RATE, duration=DURATION_SEG, octave_range=OCTAVE_RANGE,
+                 tonalidades=TONALIDADES, melody_scales=MELODY_SCALES,
+                 progression_scales=PROGRESSION_SCALES, render_size=16, transform=None):
+        self.samples_per_epoch = samples_per_epoch  # None = infinito
+        self.seed = seed
+        self.feature = feature
+        self.size = size
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.duration = duration
+        self.octave_range = octave_range
+        self.tonalidades = tonalidades
+        self.melody_scales = melody_scales
+        self.progression_scales = progression_scales
+        self.render_size = render_size
+        self.transform = transform
+        self.epoch = 0
+
+        self.classes = CLASSES
+        self.class_to_idx = {cls_name: idx for idx, cls_name in enumerate(self.classes)}
+        self.note_frequencies = calculate_note_frequencies(octave_range=octave_range, ref_freq=REF_FREQ)
+
+    def set_epoch(self, epoch):
+        """
+        Cambia la época para que cada una produzca ejemplos distintos pero reproducibles.
+        """
+        self.epoch = epoch
+
+    def _sample_specs(self, label, rng):
+        """
+        Especificaciones a renderizar para un ejemplo de la clase dada (dos en superposed).
+        """
+        cls_name = self.classes[label]
+        notes = self.note_frequencies
+        tonic = rng.choice(self.tonalidades)
+        if cls_name == 'tones':
+            return [tone_spec(rng.choice(list(notes.keys())), notes)]
+        if cls_name == 'chords':
+            chords = generate_diatonic_chords(tonic, 'major', notes, self.octave_range)
+            return [chord_spec(rng.choice(list(chords.values())), notes)]
+        melody = melody_spec(tonic, rng.choice(self.melody_scales), notes, rng,
+                             duration=self.duration, octave_range=self.octave_range)
+        progression = chord_progression_spec(tonic, rng.choice(self.progression_scales), notes, rng,
+                                             duration=self.duration, octave_range=self.octave_range)
+        if cls_name == 'melodies':
+            return [melody]
+        if cls_name == 'chord_melodies':
+            return [progression]
+        return [melody, progression]
+
+    def _features(self, signals):
+        engine = get_engine(self.sample_rate)
+        batch = engine.model_input(signals, feature=self.feature, size=self.size, channels=self.channels)
+        if self.transform:
+            return [self.transform(x) for x in batch]
+        return batch
+
+    def _worker_count(self):
+        info = get_worker_info()
+        if info is None:
+            return 0, 1
+        return info.id, info.num_workers
+
+    def __len__(self):
+        if self.samples_per_epoch is None:
+            raise TypeError("SyntheticDataset sin samples_per_epoch no tiene longitud.")
+        return self.samples_per_epoch
+
+    def __iter__(self):
+        worker_id, num_workers = self._worker_count()
+        seed = np.random.SeedSequence([self.seed, self.epoch, worker_id]).generate_state(1)[0]
+        rng = random.Random(int(seed))
+
+        if self.samples_per_epoch is None:
+            remaining = None
+        else:
+            # Repartir los ejemplos de la época entre los workers
+            remaining = self.samples_per_epoch // num_workers
+            if worker_id < self.samples_per_epoch % num_workers:
+                remaining += 1
+
+        while remaining is None or remaining > 0:
+            count = self.render_size if remaining is None else min(self.render_size, remaining)
+            labels = [rng.randrange(len(self.classes)) for _ in range(count)]
+            groups = [self._sample_specs(label, rng) for label in labels]
+            signals = render_batch([spec for group in groups for spec in group],
+                                   sample_rate=self.sample_rate, duration_seg=self.duration)
+            # Superponer en memoria las señales de cada grupo (ya normalizadas)
+            bounds = np.cumsum([0] + [len(group) for group in groups])
+            examples = superpose(signals, [range(lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:])])
+            yield from zip(self._features(examples), labels)
+            if remaining is not None:
+                remaining -= count
@@ -0,0 +1,184 @@
+# feature_engine.py
+
+from functools import lru_cache
+import numpy as np
+from .features import NPERSEG, NOVERLAP, MAX_FREQ
+from .instrumentation import timed
+
+# Parámetros de librosa.feature.chroma_stft usados por plot_chromagram
+CHROMA_N_FFT = 2048
+CHROMA_HOP = 512
+N_CHROMA = 12
+
+
+def to_model_input_batch(features, size=(128, 128), channels=3):
+    """
+    Convierte un lote de matrices de características (N, frecuencias, tiempos) en un tensor
+    (N, channels, *size) apto para CNN_LSTM: frecuencias bajas abajo, redimensionado bilineal,
+    estandarización por ejemplo y réplica en los canales.
+    """
+    import torch
+    import torch.nn.functional as F
+
+    x = torch.as_tensor(np.asarray(features, dtype=np.float32)) if not torch.is_tensor(features) \
+        else features.float()
+    x = torch.flip(x, dims=[1])
+    x = F.interpolate(x[:, None], size=size, mode='bilinear', align_corners=False)
+    flat = x.flatten(1)
+    x = (x - flat.mean(dim=1).view(-1, 1, 1, 1)) / (flat.std(dim=1).view(-1, 1, 1, 1) + 1e-6)
+    return x.expand(-1, channels, *size).contiguous()
+
+
+class FeatureEngine:
+    """
+    Extracción de características por lotes sobre un arreglo (N, muestras).
+
+    La ventana del espectrograma (la misma que usa scipy.signal.spectrogram) y el banco de
+    filtros de chroma (librosa.filters.chroma) se calculan una sola vez al crear el motor.
+    Los resultados coinciden con compute_spectrogram / compute_chromagram aplicados señal a
+    señal. Con backend='torch' las FFT se hacen con torch en los hilos de CPU configurados.
+    """
+    def __init__(self, sample_rate, nperseg=NPERSEG, noverlap=NOVERLAP, max_freq=MAX_FREQ,
+                 backend='numpy', num_threads=None, max_batch=8):
+        from scipy.signal import get_window
+
+        if backend not in ('numpy', 'torch'):
+            raise ValueError(f"Backend desconocido: {backend}")
+        self.sample_rate = sample_rate
+        self.nperseg = nperseg
+        self.noverlap = noverlap
+        self.step = nperseg - noverlap
+        self.max_freq = max_freq
+        self.backend = backend
+        self.num_threads = num_threads or -1  # Hilos de scipy.fft (-1 = todos)
+        self.max_batch = max_batch  # Señales por bloque, para que los temporales quepan en caché
+
+        # Ventana y escalas de scipy.signal.spectrogram (tukey 0.25, densidad, una cara)
+        self.window = get_window(('tukey', 0.25), nperseg).astype(np.float32)
+        self.scale = 1.0 / (sample_rate * np.sum(self.window.astype(np.float64) ** 2))
+        self.freqs = np.fft.rfftfreq(nperseg, 1.0 / sample_rate)
+        self.freq_mask = self.freqs <= max_freq
+        self.n_freqs = int(np.count_nonzero(self.freq_mask))  # Las frecuencias conservadas son un prefijo
+        # FFT de la ventana: permite restar la media de cada segmento en el dominio de la frecuencia
+        self.window_fft = np.fft.rfft(self.window)[:self.n_freqs].astype(np.complex64)
+        self.one_sided = np.full(len(self.freqs), 2.0)
+        self.one_sided[0] = 1.0
+        if nperseg % 2 == 0:
+            self.one_sided[-1] = 1.0
+
+        # Ventana y banco de filtros de chroma_stft(tuning=0, norm=2)
+        self.chroma_window = get_window('hann', CHROMA_N_FFT).astype(np.float32)
+        self.chroma_fb = self._chroma_filterbank(sample_rate)
+        self._chroma_fb_t = np.ascontiguousarray(self.chroma_fb.T)
+
+        if backend == 'torch':
+            import torch
+            if num_threads:
+                torch.set_num_threads(num_threads)
+            self._torch_window = torch.as_tensor(self.window, dtype=torch.float32)
+            self._torch_one_sided = torch.as_tensor(self.one_sided[:self.n_freqs], dtype=torch.float32)
+            self._torch_chroma_window = torch.as_tensor(self.chroma_window, dtype=torch.float32)
+            self._torch_chroma_fb = torch.as_tensor(self.chroma_fb, dtype=torch.float32)
+
+    @staticmethod
+    def _chroma_filterbank(sample_rate):
+        import librosa
+        return librosa.filters.chroma(sr=sample_rate, n_fft=CHROMA_N_FFT, tuning=0, n_chroma=N_CHROMA)
+
+    def _blocks(self, batch):
+        batch = np.atleast_2d(np.asarray(batch))
+        for start in range(0, len(batch), self.max_batch):
+            yield batch[start:start + self.max_batch]
+
+    @timed('features.engine.spectrogram')
+    def log_spectrogram(self, batch):
+        """
+        Espectrograma en dB de cada señal, limitado a max_freq.
+
+        Retorna:
+        - Arreglo float32 (N, frecuencias, tiempos).
+        """
+        compute = self._log_spectrogram_torch if self.backend == 'torch' else self._log_spectrogram_numpy
+        return np.concatenate([compute(block) for block in self._blocks(batch)])
+
+    def _log_spectrogram_numpy(self, block):
+        import scipy.fft
+
+        frames = np.lib.stride_tricks.sliding_window_view(block.astype(np.float32), self.nperseg, axis=-1)
+        frames = frames[:, ::self.step]
+        # detrend='constant' de scipy: FFT((x - media)·w) = FFT(x·w) - media·FFT(w)
+        spectrum = scipy.fft.rfft(frames * self.window, axis=-1, workers=self.num_threads)[..., :self.n_freqs]
+        spectrum -= frames.mean(axis=-1, keepdims=True) * self.window_fft
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        power *= (self.scale * self.one_sided[:self.n_freqs]).astype(np.float32)
+        power += 1e-10
+        return (10 * np.log10(power)).transpose(0, 2, 1)
+
+    def _log_spectrogram_torch(self, block):
+        import torch
+        with torch.no_grad():
+            x = torch.as_tensor(block, dtype=torch.float32)
+            frames = x.unfold(-1, self.nperseg, self.step)
+            frames = (frames - frames.mean(dim=-1, keepdim=True)) * self._torch_window
+            spectrum = torch.fft.rfft(frames, dim=-1)[..., :self.n_freqs]
+            power = spectrum.abs().square() * self.scale * self._torch_one_sided
+            return (10 * torch.log10(power + 1e-10)).transpose(1, 2).numpy()
+
+    @timed('features.engine.chroma')
+    def chroma(self, batch):
+        """
+        Chromagram normalizado (norma 2 por frame) de cada señal.
+
+        Retorna:
+        - Arreglo float32 (N, 12, tiempos).
+        """
+        compute = self._chroma_torch if self.backend == 'torch' else self._chroma_numpy
+        return np.concatenate([compute(block) for block in self._blocks(batch)])
+
+    def _chroma_numpy(self, block):
+        import scipy.fft
+
+        pad = CHROMA_N_FFT // 2
+        padded = np.pad(block.astype(np.float32), ((0, 0), (pad, pad)))
+        frames = np.lib.stride_tricks.sliding_window_view(padded, CHROMA_N_FFT, axis=-1)[:, ::CHROMA_HOP]
+        spectrum = scipy.fft.rfft(frames * self.chroma_window, axis=-1, workers=self.num_threads)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        raw = (power @ self._chroma_fb_t).transpose(0, 2, 1)
+        return self._normalize_chroma(raw)
+
+    def _chroma_torch(self, block):
+        import torch
+        with torch.no_grad():
+            x = torch.as_tensor(block, dtype=torch.float32)
+            spectrum = torch.stft(x, n_fft=CHROMA_N_FFT, hop_length=CHROMA_HOP, window=self._torch_chroma_window,
+                                  center=True, pad_mode='constant', return_complex=True)
+            raw = torch.einsum('cf,nft->nct', self._torch_chroma_fb, spectrum.abs().square())
+            return self._normalize_chroma(raw.numpy())
+
+    @staticmethod
+    def _normalize_chroma(raw):
+        # Igual que librosa.util.normalize(norm=2): los frames con norma ínfima no se escalan
+        norms = np.sqrt(np.sum(raw ** 2, axis=1, keepdims=True))
+        norms[norms < np.finfo(raw.dtype).tiny] = 1.0
+        return (raw / norms).astype(np.float32)
+
+    def features(self, batch, feature='spectrogram'):
+        if feature == 'chroma':
+            return self.chroma(batch)
+        if feature == 'spectrogram':
+            return self.log_spectrogram(batch)
+        raise ValueError(f"Característica desconocida: {feature}")
+
+    def model_input(self, batch, feature='spectrogram', size=(128, 128), channels=3):
+        """
+        Tensor (N, channels, *size) listo para CNN_LSTM a partir de un lote de señales.
+        """
+        return to_model_input_batch(self.features(batch, feature), size=size, channels=channels)
+
+
+@lru_cache(maxsize=8)
+def get_engine(sample_rate, nperseg=NPERSEG, noverlap=NOVERLAP, max_freq=MAX_FREQ, backend='numpy'):
+    """
+    FeatureEngine compartido por proceso para una configuración dada.
+    """
+    return FeatureEngine(sample_rate, nperseg=nperseg, noverlap=noverlap, max_freq=max_freq, backend=backend)
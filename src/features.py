@@ -0,0 +1,128 @@
+# features.py
+
+import os
+import json
+import hashlib
+import numpy as np
+from .audio_io import atomic_path
+from .instrumentation import timed, count
+
+# Configuración por defecto de la extracción de características
+NPERSEG = 1024
+NOVERLAP = 512
+MAX_FREQ = 8000
+
+
+@timed('features.spectrogram')
+def compute_spectrogram(signal, sample_rate, nperseg=NPERSEG, noverlap=NOVERLAP, max_freq=MAX_FREQ):
+    """
+    Calcula el espectrograma logarítmico (dB) de una señal, con los mismos parámetros que
+    plot_spectrogram pero sin pasar por matplotlib.
+
+    Parámetros:
+    - signal: La señal de audio a analizar.
+    - sample_rate: La tasa de muestreo de la señal.
+    - nperseg: Longitud de cada segmento de la STFT.
+    - noverlap: Número de muestras de solapamiento entre segmentos.
+    - max_freq: Frecuencia máxima a conservar (en Hz).
+
+    Retorna:
+    - Matriz (frecuencias, tiempos) float32 con la potencia en dB.
+    """
+    from scipy.signal import spectrogram
+
+    f, _, Sxx = spectrogram(signal, fs=sample_rate, nperseg=nperseg, noverlap=noverlap)
+    log_power = 10 * np.log10(Sxx[f <= max_freq] + 1e-10)
+    return log_power.astype(np.float32)
+
+
+@timed('features.chroma')
+def compute_chromagram(signal, sample_rate):
+    """
+    Calcula el chromagram de una señal, con los mismos parámetros que plot_chromagram.
+
+    Retorna:
+    - Matriz (12, tiempos) float32.
+    """
+    import librosa
+
+    chromagram = librosa.feature.chroma_stft(y=np.asarray(signal, dtype=np.float32), sr=sample_rate,
+                                             tuning=0, norm=2)
+    return chromagram.astype(np.float32)
+
+
+def feature_config(nperseg=NPERSEG, noverlap=NOVERLAP, max_freq=MAX_FREQ, dtype='float16'):
+    """
+    Diccionario con la configuración de extracción; forma parte de la clave de caché.
+    """
+    return {'nperseg': nperseg, 'noverlap': noverlap, 'max_freq': max_freq, 'dtype': np.dtype(dtype).name}
+
+
+def feature_key(params, config=None):
+    """
+    Calcula la clave de caché de un ejemplo a partir de sus parámetros de señal y de la
+    configuración de extracción.
+
+    Parámetros:
+    - params: Diccionario serializable en JSON que describe la señal (componentes, segmentos,
+      tasa de muestreo, duración, ...).
+    - config: Configuración de extracción (ver feature_config).
+
+    Retorna:
+    - Cadena hexadecimal de 16 caracteres.
+    """
+    payload = json.dumps({'params': params, 'config': config or feature_config()}, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+@timed('features.save')
+def save_features(signal, sample_rate, params, output_dir, config=None, compressed=False):
+    """
+    Calcula el espectrograma y el chromagram de una señal y los guarda en un archivo .npz
+    cuyo nombre es la clave de caché de sus parámetros. Si el archivo ya existe no se
+    recalcula nada.
+
+    Parámetros:
+    - signal: La señal de audio.
+    - sample_rate: La tasa de muestreo de la señal.
+    - params: Parámetros que identifican la señal (ver feature_key).
+    - output_dir: Directorio donde guardar el archivo.
+    - config: Configuración de extracción (ver feature_config).
+    - compressed: Si es True usa np.savez_compressed.
+
+    Retorna:
+    - La ruta del archivo .npz.
+    """
+    config = config or feature_config()
+    path = os.path.join(output_dir, f'{feature_key(params, config)}.npz')
+    if os.path.exists(path):
+        return path
+
+    dtype = np.dtype(config['dtype'])
+    spec = compute_spectrogram(signal, sample_rate, nperseg=config['nperseg'],
+                               noverlap=config['noverlap'], max_freq=config['max_freq'])
+    chroma = compute_chromagram(signal, sample_rate)
+
+    savez = np.savez_compressed if compressed else np.savez
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, 'wb') as f:
+            savez(f, spectrogram=spec.astype(dtype), chroma=chroma.astype(dtype),
+                  params=json.dumps(params, sort_keys=True), sample_rate=sample_rate)
+    count('bytes_written', os.path.getsize(path))
+    return path
+
+
+def load_features(path):
+    """
+    Carga un archivo de características generado por save_features.
+
+    Retorna:
+    - Diccionario con 'spectrogram', 'chroma', 'params' y 'sample_rate'.
+    """
+    with np.load(path) as data:
+        return {
+            'spectrogram': data['spectrogram'],
+            'chroma': data['chroma'],
+            'params': json.loads(str(data['params'])),
+            'sample_rate': int(data['sample_rate']),
+        }
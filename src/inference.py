@@ -0,0 +1,162 @@
+# inference.py
+
+import os
+import time
+import torch
+import torch.nn as nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+from .dataset_generator import CLASSES
+from .model import DEFAULT_CHECKPOINT, NUM_CLASSES, load_model
+
+# Modos de ejecución del modelo de inferencia
+MODES = ('eager', 'script', 'compile')
+
+# Tamaño de entrada de CNN_LSTM (canales, alto, ancho)
+INPUT_SHAPE = (3, 128, 128)
+
+
+def configure_threads(num_threads=None, interop_threads=1):
+    """
+    Ajusta los hilos de PyTorch para inferencia en CPU: num_threads hilos intra-operación
+    (por defecto uno por núcleo) y pocos hilos inter-operación, porque el modelo se ejecuta
+    como una sola cadena de operaciones.
+    """
+    torch.set_num_threads(num_threads or os.cpu_count() or 1)
+    try:
+        torch.set_num_interop_threads(interop_threads)
+    except RuntimeError:
+        pass  # Solo se puede fijar antes del primer trabajo paralelo del proceso
+
+
+def fold_batchnorm(model):
+    """
+    Pliega cada BatchNorm2d en la Conv2d que la precede (modelo en modo evaluación) y la
+    sustituye por nn.Identity, de modo que los índices de model.cnn no cambian.
+    """
+    layers = list(model.cnn)
+    for idx in range(len(layers) - 1):
+        if isinstance(layers[idx], nn.Conv2d) and isinstance(layers[idx + 1], nn.BatchNorm2d):
+            layers[idx] = fuse_conv_bn_eval(layers[idx], layers[idx + 1])
+            layers[idx + 1] = nn.Identity()
+    model.cnn = nn.Sequential(*layers)
+    return model
+
+
+def quantize(model):
+    """
+    Cuantización dinámica int8 de las capas LSTM y Linear (pesos int8, activaciones
+    cuantizadas al vuelo). Las convoluciones se mantienen en float32.
+    """
+    return torch.ao.quantization.quantize_dynamic(model, {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+
+
+def build_inference_model(checkpoint=DEFAULT_CHECKPOINT, mode='script', quantized=False,
+                          num_classes=NUM_CLASSES):
+    """
+    Carga el checkpoint y lo prepara para inferencia en CPU.
+
+    Parámetros:
+    - checkpoint: Ruta del state_dict de CNN_LSTM.
+    - mode: 'eager', 'script' (TorchScript congelado) o 'compile' (torch.compile).
+    - quantized: Si es True aplica cuantización dinámica int8 a LSTM y Linear.
+    - num_classes: Número de clases del checkpoint.
+
+    Retorna:
+    - Módulo invocable con entradas (N, 3, 128, 128).
+    """
+    if mode not in MODES:
+        raise ValueError(f"Modo desconocido: {mode}. Opciones: {MODES}")
+
+    model = fold_batchnorm(load_model(checkpoint, num_classes))
+    if quantized:
+        model = quantize(model)
+    if mode == 'script':
+        model = torch.jit.freeze(torch.jit.script(model), preserved_attrs=['forward_with_state'])
+    elif mode == 'compile':
+        model = torch.compile(model, dynamic=True)
+    return model
+
+
+class InferenceModel:
+    """
+    Envoltorio de inferencia: ejecuta el modelo sin registro de gradientes y convierte los
+    logits en clases.
+
+    Uso:
+        model = InferenceModel(quantized=True)
+        labels = model.classify(batch)  # batch: (N, 3, 128, 128), ver FeatureEngine.model_input
+    """
+    def __init__(self, checkpoint=DEFAULT_CHECKPOINT, mode='script', quantized=False, num_threads=None):
+        configure_threads(num_threads)
+        self.mode = mode
+        self.quantized = quantized
+        self.model = build_inference_model(checkpoint, mode=mode, quantized=quantized)
+        self.classes = CLASSES
+
+    def predict(self, batch):
+        """
+        Logits (N, clases) de un lote.
+        """
+        with torch.inference_mode():
+            return self.model(torch.as_tensor(batch, dtype=torch.float32))
+
+    def classify(self, batch):
+        """
+        Nombre de la clase más probable de cada ejemplo del lote.
+        """
+        return [self.classes[idx] for idx in self.predict(batch).argmax(dim=1).tolist()]
+
+
+def check_parity(candidate, reference=None, batch_size=16, seed=0, atol=1e-4):
+    """
+    Compara un modelo de inferencia con el CNN_LSTM eager original sobre entradas aleatorias.
+
+    Parámetros:
+    - candidate: Módulo a verificar (p. ej. el de build_inference_model).
+    - reference: Modelo de referencia; por defecto load_model() sin modificar.
+    - batch_size: Número de ejemplos de prueba.
+    - seed: Semilla de las entradas.
+    - atol: Diferencia máxima admitida entre logits.
+
+    Retorna:
+    - Diccionario con 'max_abs_diff', 'argmax_agreement' (fracción de clases iguales) y 'ok'.
+    """
+    reference = reference if reference is not None else load_model()
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.randn(batch_size, *INPUT_SHAPE, generator=generator)
+    with torch.inference_mode():
+        expected = reference(x)
+        actual = candidate(x)
+    max_abs_diff = (expected - actual).abs().max().item()
+    agreement = (expected.argmax(dim=1) == actual.argmax(dim=1)).float().mean().item()
+    return {'max_abs_diff': max_abs_diff, 'argmax_agreement': agreement, 'ok': max_abs_diff <= atol}
+
+
+def benchmark(model, batch_sizes=(1, 8, 32, 64), iterations=20, warmup=3):
+    """
+    Mide latencia y rendimiento del modelo para cada tamaño de lote.
+
+    Retorna:
+    - Lista de diccionarios con 'batch_size', 'latency_ms' (mediana por lote),
+      'p90_ms' y 'samples_per_sec'.
+    """
+    report = []
+    for batch_size in batch_sizes:
+        x = torch.randn(batch_size, *INPUT_SHAPE)
+        timings = []
+        with torch.inference_mode():
+            for _ in range(warmup):
+                model(x)  # Calentamiento (y compilación con torch.compile)
+            for _ in range(iterations):
+                start = time.perf_counter()
+                model(x)
+                timings.append(time.perf_counter() - start)
+        timings.sort()
+        median = timings[len(timings) // 2]
+        report.append({
+            'batch_size': batch_size,
+            'latency_ms': median * 1000,
+            'p90_ms': timings[min(len(timings) - 1, int(0.9 * len(timings)))] * 1000,
+            'samples_per_sec': batch_size / median,
+        })
+    return report
@@ -0,0 +1,267 @@
+# instrumentation.py
+
+import os
+import json
+import time
+import logging
+import threading
+import contextlib
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def _current_rss():
+    """
+    Memoria residente actual del proceso en bytes (Linux), o None si no se puede leer.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_mb():
+    """
+    Pico de memoria residente del proceso desde su inicio, en MB.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if os.uname().sysname == 'Darwin' else peak / 1024
+
+
+class _MemorySampler(threading.Thread):
+    """
+    Hilo que lee la memoria residente cada interval segundos y actualiza el pico de cada
+    etapa activa, de modo que las etapas anidadas tienen cada una su propio pico.
+    """
+    def __init__(self, interval):
+        super().__init__(name='memory-sampler', daemon=True)
+        self.interval = interval
+        self._active = {}  # token -> pico observado (bytes)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._next_token = 0
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        rss = _current_rss()
+        if rss is None:
+            return
+        with self._lock:
+            for token, peak in self._active.items():
+                if rss > peak:
+                    self._active[token] = rss
+
+    def begin(self):
+        with self._lock:
+            token = self._next_token
+            self._next_token += 1
+            self._active[token] = _current_rss() or 0
+        return token
+
+    def end(self, token):
+        self._sample()
+        with self._lock:
+            return self._active.pop(token)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class Instrumentation:
+    """
+    Registro de tiempos por etapa, contadores y picos de memoria.
+
+    Uso:
+        with METRICS.timer('signal.build'):
+            ...
+        METRICS.count('samples_rendered', n)
+        METRICS.write_summary('metrics.json')
+
+    Los tiempos se acumulan por nombre de etapa (llamadas, total, máximo). Con
+    start_memory_sampling() cada etapa registra además el pico de memoria residente
+    observado mientras estaba activa.
+    """
+    def __init__(self):
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._sampler = None
+        self.reset()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # El hilo de muestreo no existe en el proceso hijo y el lock pudo copiarse tomado
+        self._lock = threading.Lock()
+        self._sampler = None
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+            self._started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def timer(self, stage):
+        """
+        Context manager que mide la duración (y el pico de memoria, si se muestrea) de una etapa.
+        """
+        if not self.enabled:
+            yield
+            return
+        sampler = self._sampler
+        token = sampler.begin() if sampler else None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = sampler.end(token) if sampler else None
+            self._record(stage, 1, elapsed, elapsed, peak)
+
+    def timed(self, stage):
+        """
+        Decorador equivalente a envolver la función en timer(stage).
+        """
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, value=1):
+        """
+        Suma value al contador name (muestras renderizadas, bytes escritos, ...).
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def _record(self, stage, calls, seconds, max_seconds, peak_bytes):
+        with self._lock:
+            entry = self.stages.setdefault(stage, {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            entry['calls'] += calls
+            entry['seconds'] += seconds
+            entry['max_seconds'] = max(entry['max_seconds'], max_seconds)
+            if peak_bytes is not None:
+                entry['peak_rss_mb'] = max(entry.get('peak_rss_mb', 0.0), peak_bytes / (1024 * 1024))
+
+    def start_memory_sampling(self, interval=0.01):
+        """
+        Arranca el hilo de muestreo de memoria (una lectura de /proc cada interval segundos).
+        """
+        if self._sampler is None:
+            self._sampler = _MemorySampler(interval)
+            self._sampler.start()
+
+    def stop_memory_sampling(self):
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler = None
+
+    def snapshot(self):
+        """
+        Copia serializable de etapas y contadores, p. ej. para enviarla desde un proceso worker.
+        """
+        with self._lock:
+            return {'stages': {name: dict(entry) for name, entry in self.stages.items()},
+                    'counters': dict(self.counters)}
+
+    def merge(self, snapshot):
+        """
+        Acumula en este registro una instantánea de otro proceso.
+        """
+        for stage, entry in snapshot['stages'].items():
+            peak = entry.get('peak_rss_mb')
+            self._record(stage, entry['calls'], entry['seconds'], entry['max_seconds'],
+                         peak * 1024 * 1024 if peak is not None else None)
+        for name, value in snapshot['counters'].items():
+            self.count(name, value)
+
+    def summary(self):
+        """
+        Resumen por etapa ordenado por tiempo total, con contadores y pico de memoria del proceso.
+        """
+        data = self.snapshot()
+        stages = []
+        for name, entry in sorted(data['stages'].items(), key=lambda item: -item[1]['seconds']):
+            stages.append(dict(entry, stage=name, mean_seconds=entry['seconds'] / entry['calls']))
+        return {
+            'wall_seconds': time.perf_counter() - self._started,
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': stages,
+            'counters': data['counters'],
+        }
+
+    def write_summary(self, filename):
+        with open(filename, 'w') as f:
+            json.dump(self.summary(), f, indent=4)
+        logger.info('Resumen de instrumentación guardado en %s', filename)
+
+    def log_summary(self, level=logging.INFO):
+        summary = self.summary()
+        for entry in summary['stages']:
+            logger.log(level, '%-28s %6d llamadas %10.3f s (máx %.3f s)', entry['stage'], entry['calls'],
+                       entry['seconds'], entry['max_seconds'])
+        for name, value in summary['counters'].items():
+            logger.log(level, '%-28s %d', name, value)
+
+
+# Registro global del proceso
+METRICS = Instrumentation()
+timer = METRICS.timer
+timed = METRICS.timed
+count = METRICS.count
+
+
+@contextlib.contextmanager
+def profile(filename, profiler='cprofile'):
+    """
+    Perfila el bloque y guarda el resultado en filename.
+
+    Parámetros:
+    - profiler: 'cprofile' (volcado .prof legible con pstats o snakeviz) o 'pyinstrument'
+      (informe HTML; requiere tener pyinstrument instalado).
+    """
+    if profiler == 'pyinstrument':
+        from pyinstrument import Profiler
+
+        instrument = Profiler()
+        instrument.start()
+        try:
+            yield
+        finally:
+            instrument.stop()
+            with open(filename, 'w') as f:
+                f.write(instrument.output_html())
+            logger.info('Perfil guardado en %s', filename)
+        return
+    if profiler != 'cprofile':
+        raise ValueError(f"Perfilador desconocido: {profiler}")
+
+    import cProfile
+
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        prof.dump_stats(filename)
+        logger.info('Perfil guardado en %s', filename)
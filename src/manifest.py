@@ -0,0 +1,103 @@
+# manifest.py
+
+import os
+import json
+import hashlib
+import sqlite3
+
+# Archivo del manifiesto dentro del directorio de datos
+MANIFEST_FILENAME = 'manifest.sqlite'
+
+
+def content_hash(payload):
+    """
+    Hash estable de un objeto serializable en JSON (claves ordenadas).
+
+    Retorna:
+    - Cadena hexadecimal de 16 caracteres.
+    """
+    data = json.dumps(payload, sort_keys=True)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()[:16]
+
+
+class Manifest:
+    """
+    Índice SQLite de los ejemplos construidos en un directorio de datos: para cada clave de
+    tarea guarda su clase, el hash de todo lo que determina sus archivos, la especificación
+    completa y las rutas (relativas al directorio) de los archivos escritos.
+
+    Solo el proceso principal escribe en el manifiesto; los workers se limitan a devolver
+    las rutas que generan.
+    """
+    def __init__(self, data_dir, filename=MANIFEST_FILENAME):
+        self.data_dir = data_dir
+        self.path = os.path.join(data_dir, filename)
+        os.makedirs(data_dir, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS examples ('
+            ' key TEXT PRIMARY KEY,'
+            ' kind TEXT NOT NULL,'
+            ' hash TEXT NOT NULL,'
+            ' spec TEXT NOT NULL,'
+            ' outputs TEXT NOT NULL)')
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM examples').fetchone()[0]
+
+    def get(self, key):
+        """
+        Entrada de una tarea como diccionario, o None si no está en el manifiesto.
+        """
+        row = self.connection.execute(
+            'SELECT key, kind, hash, spec, outputs FROM examples WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        return {'key': row[0], 'kind': row[1], 'hash': row[2], 'spec': json.loads(row[3]),
+                'outputs': json.loads(row[4])}
+
+    def keys(self):
+        return [row[0] for row in self.connection.execute('SELECT key FROM examples ORDER BY key')]
+
+    def is_current(self, key, hash_value, outputs):
+        """
+        Indica si la tarea ya está construida con el mismo hash y todos los archivos
+        requeridos siguen en disco.
+
+        Parámetros:
+        - key: Clave de la tarea.
+        - hash_value: Hash actual de la tarea.
+        - outputs: Rutas relativas que la tarea debe tener.
+        """
+        entry = self.get(key)
+        if entry is None or entry['hash'] != hash_value:
+            return False
+        recorded = set(entry['outputs'])
+        return all(path in recorded and os.path.exists(os.path.join(self.data_dir, path)) for path in outputs)
+
+    def record(self, entries):
+        """
+        Inserta o reemplaza entradas en una sola transacción.
+
+        Parámetros:
+        - entries: Iterable de diccionarios con 'key', 'kind', 'hash', 'spec' y 'outputs'.
+        """
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO examples (key, kind, hash, spec, outputs) VALUES (?, ?, ?, ?, ?)',
+                [(entry['key'], entry['kind'], entry['hash'], json.dumps(entry['spec'], sort_keys=True),
+                  json.dumps(entry['outputs'])) for entry in entries])
+
+    def remove(self, keys):
+        with self.connection:
+            self.connection.executemany('DELETE FROM examples WHERE key = ?', [(key,) for key in keys])
@@ -0,0 +1,122 @@
+# model.py
+
+import os
+import json
+from typing import Optional, Tuple
+import torch
+import torch.nn as nn
+from .dataset_generator import CLASSES
+
+NUM_CLASSES = len(CLASSES)
+
+# Checkpoint entrenado en notebooks/NN.ipynb
+DEFAULT_CHECKPOINT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'notebooks', 'cnn_lstm_model.pth')
+
+# Entradas con las que se entrena un checkpoint (ver checkpoint_metadata)
+INPUT_IMAGES = 'images'  # Espectrogramas PNG RGB escalados a [-1, 1] (NN.ipynb, --source images)
+INPUT_FEATURES = 'features'  # Características estandarizadas de FeatureEngine.model_input
+
+
+class CNN_LSTM(nn.Module):
+    def __init__(self, num_classes):
+        super(CNN_LSTM, self).__init__()
+
+        # Definición de la parte CNN del modelo
+        self.cnn = nn.Sequential(
+            nn.Conv2d(3, 16, kernel_size=3, padding=1),  # Capa de convolución
+            nn.BatchNorm2d(16),  # Normalización por lotes
+            nn.ReLU(),  # Función de activación
+            nn.MaxPool2d(2, 2),  # Capa de pooling
+
+            nn.Conv2d(16, 32, kernel_size=3, padding=1),
+            nn.BatchNorm2d(32),
+            nn.ReLU(),
+            nn.MaxPool2d(2, 2),
+        )
+
+        # Parámetros para la parte LSTM
+        self.lstm_input_size = 32 * 32  # Tamaño de entrada para la LSTM
+        self.hidden_size = 64  # Tamaño de las capas ocultas de la LSTM
+        self.num_layers = 2  # Número de capas en la LSTM
+
+        # Definición de la LSTM
+        self.lstm = nn.LSTM(input_size=self.lstm_input_size, hidden_size=self.hidden_size,
+                            num_layers=self.num_layers, batch_first=True)
+
+        # Capa totalmente conectada para la clasificación final
+        self.fc = nn.Linear(self.hidden_size, num_classes)
+
+    def forward(self, x):
+        out, _ = self.forward_with_state(x, None)
+        return out
+
+    @torch.jit.export
+    def forward_with_state(self, x, state: Optional[Tuple[torch.Tensor, torch.Tensor]] = None):
+        """
+        Igual que forward, pero parte del estado (h, c) de la LSTM indicado en lugar de ceros
+        y retorna también el estado final, para encadenar ventanas consecutivas.
+        """
+        batch_size = x.size(0)
+        x = self.cnn(x)  # Pasamos por la CNN
+        x = x.view(batch_size, -1, self.lstm_input_size)  # Remodelamos para la LSTM
+        if state is None:
+            h_0 = torch.zeros(self.num_layers, batch_size, self.hidden_size).to(x.device)  # Estado oculto inicial
+            c_0 = torch.zeros(self.num_layers, batch_size, self.hidden_size).to(x.device)  # Estado de celda inicial
+            state = (h_0, c_0)
+        out, state = self.lstm(x, state)  # Pasamos por la LSTM
+        out = out[:, -1, :]  # Tomamos la última salida de la secuencia
+        out = self.fc(out)  # Pasamos por la capa final
+        return out, state
+
+
+def load_model(checkpoint=DEFAULT_CHECKPOINT, num_classes=NUM_CLASSES):
+    """
+    Crea un CNN_LSTM, carga los pesos guardados con torch.save(model.state_dict(), ...) y lo
+    deja en modo evaluación en CPU.
+    """
+    model = CNN_LSTM(num_classes)
+    state_dict = torch.load(checkpoint, map_location='cpu', weights_only=True)
+    model.load_state_dict(state_dict)
+    return model.eval()
+
+
+def metadata_path(checkpoint):
+    """
+    Ruta del JSON de metadatos asociado a un checkpoint (modelo.pth -> modelo_metadata.json).
+    """
+    return os.path.splitext(checkpoint)[0] + '_metadata.json'
+
+
+def checkpoint_metadata(checkpoint):
+    """
+    Metadatos de entrenamiento de un checkpoint: {'input': INPUT_IMAGES | INPUT_FEATURES,
+    'feature': ...}. Los checkpoints sin metadatos, como DEFAULT_CHECKPOINT, se entrenaron
+    con los PNG del notebook.
+    """
+    path = metadata_path(checkpoint)
+    if not os.path.exists(path):
+        return {'input': INPUT_IMAGES}
+    with open(path) as f:
+        return json.load(f)
+
+
+def require_feature_checkpoint(checkpoint, feature='spectrogram'):
+    """
+    Comprueba que el checkpoint se entrenó con las mismas características que calcula
+    FeatureEngine.model_input (train_model.py --source features o shards). Un checkpoint
+    entrenado con PNG recibiría entradas de otra distribución y sus etiquetas no
+    significarían nada.
+
+    Lanza:
+    - ValueError si el checkpoint no se entrenó con la característica feature.
+    """
+    metadata = checkpoint_metadata(checkpoint)
+    if metadata.get('input') != INPUT_FEATURES:
+        raise ValueError(f"El checkpoint {checkpoint} se entrenó con espectrogramas PNG, no con las "
+                         f"características que calcula FeatureEngine. Entrena uno con "
+                         f"'python train_model.py --source features' (o shards).")
+    if metadata.get('feature') != feature:
+        raise ValueError(f"El checkpoint {checkpoint} se entrenó con '{metadata.get('feature')}', "
+                         f"no con '{feature}'.")
+    return metadata
@@ -1,63 +1,202 @@
 # rhythm_signal.py
 
+import logging
+from functools import lru_cache
 import numpy as np
-import matplotlib.pyplot as plt
-from .composite_signal import CompositeSignal
+from .base_signal import DEFAULT_BLOCK_SIZE, DEFAULT_DTYPE
+from .composite_signal import CompositeSignal, MAX_BLOCK_ELEMENTS
+from .instrumentation import timed, count
 from .utils import normalize_signal, analyze_components
 
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=256)
+def _adsr_curve(attack, decay, sustain, release, hold_samples, sample_rate):
+    """
+    Curva ADSR de hold_samples muestras de nota más la cola de liberación. Se calcula una vez
+    por combinación de parámetros y se comparte (solo lectura) entre eventos.
+    """
+    attack_samples = int(attack * sample_rate)
+    decay_samples = int(decay * sample_rate)
+    release_samples = int(release * sample_rate)
+
+    hold = np.concatenate([
+        np.linspace(0.0, 1.0, attack_samples, endpoint=False),
+        np.linspace(1.0, sustain, decay_samples, endpoint=False),
+        np.full(max(0, hold_samples - attack_samples - decay_samples), sustain),
+    ])[:hold_samples]
+    level = hold[-1] if hold_samples else 0.0
+    curve = np.concatenate([hold, np.linspace(level, 0.0, release_samples, endpoint=False)])
+    curve.setflags(write=False)
+    return curve
+
+
+class ADSREnvelope:
+    """
+    Envolvente ataque-decaimiento-sostenimiento-liberación. attack, decay y release en segundos;
+    sustain es el nivel (0..1). La liberación empieza al terminar la duración del evento.
+    """
+    def __init__(self, attack=0.01, decay=0.05, sustain=0.8, release=0.05):
+        self.attack = attack
+        self.decay = decay
+        self.sustain = sustain
+        self.release = release
+
+    def key(self):
+        return (self.attack, self.decay, self.sustain, self.release)
+
+    def curve(self, hold_samples, sample_rate):
+        return _adsr_curve(*self.key(), hold_samples, sample_rate)
+
+
 class RhythmSignal(CompositeSignal):
-    def __init__(self, sample_rate=44100, duration_seg=5.0, unit_time=1.0):
-        super().__init__(sample_rate, duration_seg)
+    def __init__(self, sample_rate=44100, duration_seg=5.0, unit_time=1.0, oscillator='cos',
+                 dtype=DEFAULT_DTYPE):
+        super().__init__(sample_rate, duration_seg, oscillator, dtype)
         self.unit_time = unit_time
         self.segments = []  # Lista para almacenar los segmentos
         self.timeline = []  # Registro temporal de notas
+        self.events = []  # Eventos a renderizar (segmentos incluidos)
 
     def add_segment(self, components, label=None):
         current_duration = len(self.segments) * self.unit_time
         if current_duration >= self.duration_seg:
             raise ValueError("Se ha alcanzado la duración total de la señal.")
         self.segments.append(components)
+        self._append_event(current_duration, self.unit_time, components, None, label)
+
+    def add_event(self, onset, duration, components, envelope=None, label=None):
+        """
+        Añade un evento con inicio y duración arbitrarios. Los eventos pueden solaparse.
+
+        Parámetros:
+        - onset: Instante de inicio en segundos.
+        - duration: Duración de la nota en segundos (sin contar la liberación de la envolvente).
+        - components: Lista de diccionarios {'amplitude', 'freq', 'phase'}.
+        - envelope: ADSREnvelope opcional. Sin envolvente el evento se corta en seco.
+        - label: Etiqueta del evento.
+        """
+        if onset < 0 or onset >= self.duration_seg:
+            raise ValueError("El inicio del evento está fuera de la duración de la señal.")
+        if duration <= 0:
+            raise ValueError("La duración del evento debe ser positiva.")
+        self._append_event(onset, duration, components, envelope, label)
 
-        segment_info = {
-            'start_time': current_duration,
-            'duration': self.unit_time,
+    def _append_event(self, onset, duration, components, envelope, label):
+        start_idx = int(onset * self.sample_rate)
+        hold_samples = int((onset + duration) * self.sample_rate) - start_idx
+        release_samples = int(envelope.release * self.sample_rate) if envelope else 0
+        self.events.append({
+            'onset': onset,
+            'components': components,
+            'envelope': envelope,
+            'start_idx': start_idx,
+            'hold_samples': hold_samples,
+            'end_idx': start_idx + hold_samples + release_samples,
+        })
+        self.timeline.append({
+            'start_time': onset,
+            'duration': duration,
             'components': components,
             'label': label
-        }
-        self.timeline.append(segment_info)
+        })
 
-    def build_signal(self):
-        if not self.segments:
-            raise RuntimeError("No hay segmentos para construir la señal.")
+    def _render_events(self, start, stop, out):
+        """
+        Acumula en out los eventos que cubren las muestras [start, stop). Solo se evalúan las
+        muestras de cada evento; los eventos con el mismo número de muestras y la misma
+        envolvente se evalúan juntos como una matriz (parejas evento-componente × muestras).
+        """
+        groups = {}
+        for event in self.events:
+            lo = max(start, event['start_idx'])
+            hi = min(stop, event['end_idx'], self.num_samples)
+            if lo >= hi or not event['components']:
+                continue
+            envelope = event['envelope']
+            key = (hi - lo, envelope.key() if envelope else None, event['hold_samples'])
+            groups.setdefault(key, []).append((event, lo))
 
-        self.signal = np.zeros_like(self.t)
+        dt = self.duration_seg / self.num_samples
+        for (length, envelope_key, hold_samples), members in groups.items():
+            curve = _adsr_curve(*envelope_key, hold_samples, self.sample_rate) if envelope_key else None
+            max_pairs = max(1, MAX_BLOCK_ELEMENTS // length)
+            offsets = np.arange(length)
+            chunk, n_pairs = [], 0
+            for event, lo in members:
+                chunk.append((event, lo))
+                n_pairs += len(event['components'])
+                if n_pairs >= max_pairs:
+                    self._render_chunk(chunk, length, offsets, curve, dt, start, out)
+                    chunk, n_pairs = [], 0
+            if chunk:
+                self._render_chunk(chunk, length, offsets, curve, dt, start, out)
+        return out
 
-        for idx, segment_components in enumerate(self.segments):
-            start_time = idx * self.unit_time
-            end_time = start_time + self.unit_time
-            start_idx = int(start_time * self.sample_rate)
-            end_idx = int(end_time * self.sample_rate)
-            t_segment = self.t[start_idx:end_idx] - start_time
+    def _render_chunk(self, chunk, length, offsets, curve, dt, start, out):
+        amplitudes, omegas, phases, onsets, los, row_starts = [], [], [], [], [], []
+        for event, lo in chunk:
+            row_starts.append(len(amplitudes))
+            for comp in event['components']:
+                amplitudes.append(comp['amplitude'])
+                omegas.append(2 * np.pi * comp['freq'])
+                phases.append(comp.get('phase', 0.0))
+                onsets.append(event['onset'])
+                los.append(lo)
 
-            if not segment_components:
-                continue
+        if self.oscillator == 'cos':
+            # Mismo cálculo que oscillator(): ω·(índice·dt - t0) + φ, con t0 el inicio del evento
+            los = np.array(los)
+            arg = np.array(omegas)[:, np.newaxis] * (
+                (los[:, np.newaxis] + offsets) * dt - np.array(onsets)[:, np.newaxis])
+            arg += np.array(phases)[:, np.newaxis]
+            waves = np.cos(arg, out=np.empty(arg.shape, dtype=self.dtype))
+        else:
+            waves = np.array([self._oscillate(omega / (2 * np.pi), phase, lo, lo + length, t0=onset)
+                              for omega, phase, lo, onset in zip(omegas, phases, los, onsets)])
+        waves *= np.array(amplitudes, dtype=self.dtype)[:, np.newaxis]
+        rows = np.add.reduceat(waves, row_starts, axis=0)
 
-            amplitudes = np.array([comp['amplitude'] for comp in segment_components])
-            freqs = np.array([comp['freq'] for comp in segment_components])
-            phases = np.array([comp.get('phase', 0.0) for comp in segment_components])
+        for (event, lo), row in zip(chunk, rows):
+            if curve is not None:
+                offset = lo - event['start_idx']
+                row *= curve[offset:offset + length]
+            out[lo - start:lo - start + length] += row
 
-            omega = 2 * np.pi * freqs[:, np.newaxis]
-            t_matrix = t_segment[np.newaxis, :]
+    @timed('signal.build')
+    def build_signal(self):
+        if not self.events:
+            raise RuntimeError("No hay segmentos para construir la señal.")
 
-            segment_signals = amplitudes[:, np.newaxis] * np.cos(omega * t_matrix + phases[:, np.newaxis])
-            segment_signal = np.sum(segment_signals, axis=0)
+        self.signal = self._render_events(0, self.num_samples, np.zeros(self.num_samples, dtype=self.dtype))
+        normalize_signal(self.signal, inplace=True)
+        count('samples_rendered', len(self.signal))
+        logger.info('Señal de ritmo generada con %d eventos.', len(self.events))
 
-            self.signal[start_idx:end_idx] += segment_signal
+    def iter_blocks(self, block_size=DEFAULT_BLOCK_SIZE):
+        if not self.events:
+            raise RuntimeError("No hay segmentos para construir la señal.")
 
-        self.signal = normalize_signal(self.signal)
-        print(f'Señal de ritmo generada con {len(self.segments)} segmentos.')
+        for start in range(0, self.num_samples, block_size):
+            stop = min(start + block_size, self.num_samples)
+            yield self._render_events(start, stop, np.zeros(stop - start, dtype=self.dtype))
+
+    def predicted_peak(self):
+        # Máxima suma de amplitudes entre eventos simultáneos (las envolventes no superan 1)
+        changes = []
+        for event in self.events:
+            weight = sum(abs(comp['amplitude']) for comp in event['components'])
+            changes.append((event['start_idx'], weight))
+            changes.append((event['end_idx'], -weight))
+        peak = level = 0.0
+        for _, delta in sorted(changes):
+            level += delta
+            peak = max(peak, level)
+        return peak
 
     def analyze_components(self):
+        import matplotlib.pyplot as plt
+
         for segment in self.timeline:
             print(f"Segmento desde {segment['start_time']}s hasta {segment['start_time'] + segment['duration']}s - Label: {segment['label']}")
             analyze_components(segment['components'])
@@ -0,0 +1,311 @@
+# server.py
+#
+# Servicio local de clasificación con CNN_LSTM. Acepta WAV o PCM int16 por HTTP (TCP o
+# socket Unix), extrae las características en un pool de hilos y agrupa las peticiones
+# concurrentes en micro-lotes con una latencia máxima de espera.
+#
+#   python -m src.server --checkpoint cnn_lstm_model.pth --port 8000
+#   python -m src.server --checkpoint cnn_lstm_model.pth --unix /tmp/cnn_lstm.sock
+#
+# El checkpoint debe estar entrenado con train_model.py --source features (o shards): el
+# servidor calcula las mismas características y rechaza los checkpoints entrenados con PNG.
+#
+#   curl --data-binary @data/tones/A4.wav -H 'Content-Type: audio/wav' localhost:8000/classify
+
+import io
+import os
+import json
+import time
+import wave
+import queue
+import logging
+import argparse
+import threading
+import socketserver
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import torch
+from .dataset_generator import SAMPLE_RATE
+from .feature_engine import get_engine
+from .inference import InferenceModel
+from .model import require_feature_checkpoint
+from .utils import INT16_MAX
+
+logger = logging.getLogger(__name__)
+
+# Tipos de contenido aceptados: WAV completo o PCM int16 little-endian mono sin cabecera
+WAV_CONTENT_TYPES = ('audio/wav', 'audio/x-wav', 'audio/wave')
+PCM_CONTENT_TYPES = ('audio/l16', 'audio/pcm', 'application/octet-stream')
+
+DEFAULT_MAX_BATCH = 32
+DEFAULT_MAX_LATENCY_MS = 10.0
+
+
+def decode_audio(payload, content_type, sample_rate=None):
+    """
+    Decodifica el cuerpo de una petición a una señal float32 en [-1, 1].
+
+    Parámetros:
+    - payload: Bytes del WAV o del PCM.
+    - content_type: Tipo de contenido (ver WAV_CONTENT_TYPES y PCM_CONTENT_TYPES).
+    - sample_rate: Tasa de muestreo del PCM (los WAV la llevan en la cabecera).
+
+    Retorna:
+    - (señal, tasa de muestreo).
+    """
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type in WAV_CONTENT_TYPES:
+        try:
+            with wave.open(io.BytesIO(payload), 'rb') as wav:
+                if wav.getsampwidth() != 2:
+                    raise ValueError("Solo se aceptan WAV PCM de 16 bits.")
+                channels = wav.getnchannels()
+                sample_rate = wav.getframerate()
+                pcm = np.frombuffer(wav.readframes(wav.getnframes()), dtype='<i2')
+        except EOFError as exc:
+            raise ValueError("WAV no válido: el archivo está truncado.") from exc
+        except wave.Error as exc:
+            raise ValueError(f"WAV no válido: {exc!r}") from exc
+        if channels > 1:
+            pcm = pcm.reshape(-1, channels).mean(axis=1)
+    elif content_type in PCM_CONTENT_TYPES:
+        if len(payload) % 2:
+            raise ValueError("El PCM int16 debe tener un número par de bytes.")
+        pcm = np.frombuffer(payload, dtype='<i2')
+        sample_rate = sample_rate or SAMPLE_RATE
+    else:
+        raise ValueError(f"Tipo de contenido no soportado: {content_type or '(vacío)'}")
+    if sample_rate <= 0:
+        raise ValueError(f"Tasa de muestreo no válida: {sample_rate}")
+    return pcm.astype(np.float32) / INT16_MAX, sample_rate
+
+
+class MicroBatcher:
+    """
+    Agrupa entradas que llegan de forma concurrente en lotes de hasta max_batch ejemplos.
+    Un lote se ejecuta en cuanto se llena o cuando su petición más antigua ha esperado
+    max_latency_ms, lo que ocurra primero. Un único hilo ejecuta el modelo.
+    """
+    def __init__(self, predict, max_batch=DEFAULT_MAX_BATCH, max_latency_ms=DEFAULT_MAX_LATENCY_MS):
+        self.predict = predict  # Función lote (N, ...) -> logits (N, clases)
+        self.max_batch = max_batch
+        self.max_latency = max_latency_ms / 1000
+        self.batch_sizes = []  # Tamaño de cada lote ejecutado, para estadísticas
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, x):
+        """
+        Encola una entrada y retorna un Future con su fila de logits.
+        """
+        future = Future()
+        self._queue.put((x, future))
+        return future
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)  # Terminar después de este lote
+                    break
+                batch.append(item)
+            self._execute(batch)
+
+    def _execute(self, batch):
+        inputs, futures = zip(*batch)
+        self.batch_sizes.append(len(batch))
+        try:
+            logits = self.predict(torch.stack(inputs))
+        except Exception as exc:
+            for future in futures:
+                future.set_exception(exc)
+            return
+        for future, row in zip(futures, logits):
+            future.set_result(row)
+
+
+class ScoringService:
+    """
+    Servicio de clasificación en proceso: el modelo se carga una vez, las características
+    se calculan en feature_workers hilos y el modelo se ejecuta en micro-lotes.
+
+    checkpoint debe estar entrenado con la misma característica (train_model.py --source
+    features o shards); si no, se lanza ValueError (ver model.require_feature_checkpoint).
+    """
+    def __init__(self, checkpoint, mode='script', quantized=False, num_threads=None,
+                 feature='spectrogram', feature_workers=None, max_batch=DEFAULT_MAX_BATCH,
+                 max_latency_ms=DEFAULT_MAX_LATENCY_MS):
+        require_feature_checkpoint(checkpoint, feature)
+        self.model = InferenceModel(checkpoint, mode=mode, quantized=quantized, num_threads=num_threads)
+        self.feature = feature
+        self.classes = self.model.classes
+        self.pool = ThreadPoolExecutor(max_workers=feature_workers or os.cpu_count() or 1,
+                                       thread_name_prefix='features')
+        self._warmup(max_batch)
+        self.batcher = MicroBatcher(self.model.predict, max_batch=max_batch, max_latency_ms=max_latency_ms)
+
+    def _warmup(self, max_batch):
+        # Crear el motor de características (banco de filtros de librosa) y dejar que
+        # TorchScript / torch.compile optimicen antes de aceptar peticiones, para que las
+        # primeras no paguen segundos de latencia
+        get_engine(SAMPLE_RATE).model_input(np.zeros((1, SAMPLE_RATE), dtype=np.float32), feature=self.feature)
+        for batch_size in sorted({1, max(1, max_batch // 2), max_batch}):
+            for _ in range(2):
+                self.model.predict(torch.zeros(batch_size, 3, 128, 128))
+
+    def _featurize(self, payload, content_type, sample_rate):
+        signal, sample_rate = decode_audio(payload, content_type, sample_rate)
+        engine = get_engine(sample_rate)
+        if len(signal) < engine.nperseg:
+            raise ValueError(f"La señal debe tener al menos {engine.nperseg} muestras.")
+        return engine.model_input(signal[np.newaxis], feature=self.feature)[0]
+
+    def classify(self, payload, content_type, sample_rate=None):
+        """
+        Clasifica un audio.
+
+        Retorna:
+        - Diccionario con 'label' y 'probabilities' (clase -> probabilidad).
+        """
+        x = self.pool.submit(self._featurize, payload, content_type, sample_rate).result()
+        logits = self.batcher.submit(x).result()
+        probabilities = torch.softmax(logits.float(), dim=0).tolist()
+        return {
+            'label': self.classes[int(np.argmax(probabilities))],
+            'probabilities': dict(zip(self.classes, probabilities)),
+        }
+
+    def close(self):
+        self.batcher.close()
+        self.pool.shutdown()
+
+
+class ClassifyHandler(BaseHTTPRequestHandler):
+    """
+    POST /classify con el audio en el cuerpo (Content-Type audio/wav o audio/L16; para PCM,
+    ?rate=<Hz>). GET /health responde con el estado del servicio.
+    """
+    service = None  # ScoringService, asignado por make_server
+    verbose = False
+
+    def do_GET(self):
+        if urlparse(self.path).path != '/health':
+            self._send_json(404, {'error': 'Ruta no encontrada.'})
+            return
+        self._send_json(200, {'status': 'ok', 'classes': self.service.classes})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/classify':
+            self._send_json(404, {'error': 'Ruta no encontrada.'})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = self.rfile.read(length)
+        rate = parse_qs(url.query).get('rate')
+        try:
+            sample_rate = int(rate[0]) if rate else None
+        except ValueError:
+            sample_rate = 0
+        if sample_rate is not None and sample_rate <= 0:
+            self._send_json(400, {'error': "rate debe ser un entero positivo (Hz)."})
+            return
+        try:
+            result = self.service.classify(payload, self.headers.get('Content-Type'), sample_rate=sample_rate)
+        except ValueError as exc:
+            self._send_json(400, {'error': str(exc)})
+            return
+        except Exception as exc:
+            logger.exception('Error al clasificar la petición')
+            self._send_json(500, {'error': f"Error interno: {exc!r}"})
+            return
+        self._send_json(200, result)
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Los sockets Unix no tienen dirección de cliente
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class ThreadingTCPHTTPServer(ThreadingHTTPServer):
+    # La cola de conexiones por defecto (5) rechaza ráfagas de clientes concurrentes
+    request_queue_size = 128
+
+
+def make_server(service, host='127.0.0.1', port=8000, unix_socket=None, verbose=False):
+    """
+    Crea el servidor HTTP del servicio, en TCP (host, port) o en el socket Unix indicado.
+    """
+    handler = type('BoundClassifyHandler', (ClassifyHandler,), {'service': service, 'verbose': verbose})
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        return ThreadingUnixHTTPServer(unix_socket, handler)
+    return ThreadingTCPHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local de clasificación con CNN_LSTM.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--unix', default=None, help="Ruta de un socket Unix (en lugar de TCP).")
+    parser.add_argument('--checkpoint', required=True,
+                        help="state_dict entrenado con train_model.py --source features (o shards).")
+    parser.add_argument('--mode', default='script', choices=['eager', 'script', 'compile'])
+    parser.add_argument('--quantized', action='store_true', help="Cuantización dinámica int8 de LSTM y Linear.")
+    parser.add_argument('--threads', type=int, default=None, help="Hilos de PyTorch.")
+    parser.add_argument('--feature-workers', type=int, default=None, help="Hilos de extracción de características.")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument('--max-latency-ms', type=float, default=DEFAULT_MAX_LATENCY_MS)
+    parser.add_argument('--verbose', action='store_true', help="Registrar cada petición.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    service = ScoringService(args.checkpoint, mode=args.mode, quantized=args.quantized, num_threads=args.threads,
+                             feature_workers=args.feature_workers, max_batch=args.max_batch,
+                             max_latency_ms=args.max_latency_ms)
+    server = make_server(service, args.host, args.port, unix_socket=args.unix, verbose=args.verbose)
+    logging.info('Servidor escuchando en %s', args.unix or f'http://{args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
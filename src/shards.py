@@ -0,0 +1,77 @@
+# shards.py
+
+import os
+import logging
+import numpy as np
+from .audio_io import atomic_path, write_metadata
+from .datasets import FeatureDataset, INDEX_FILENAME, LABELS_FILENAME
+
+logger = logging.getLogger(__name__)
+
+
+def _write_shard(path, examples, count, shape, dtype):
+    """
+    Escribe count arreglos de forma shape en un único .npy de forma (count, *shape),
+    fila a fila, sin mantenerlos todos en memoria.
+    """
+    with atomic_path(path) as tmp_path:
+        shard = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(count,) + tuple(shape))
+        for row, example in enumerate(examples):
+            shard[row] = example
+        shard.flush()
+        del shard
+
+
+def pack_shards(feature_dir, output_dir, feature='spectrogram', size=(128, 128), shard_size=4096,
+                dtype='float32'):
+    """
+    Empaqueta las características de FeatureDataset en pocos archivos .npy grandes, uno o
+    varios por clase, de forma fija (n, alto, ancho), junto con un índice de etiquetas y
+    metadatos. Cada ejemplo se guarda ya redimensionado y estandarizado (un canal).
+
+    Parámetros:
+    - feature_dir: Directorio con una carpeta de .npz por clase (ver save_features).
+    - output_dir: Directorio donde escribir los shards y el índice.
+    - feature: 'spectrogram' o 'chroma'.
+    - size: Tamaño (alto, ancho) de cada ejemplo.
+    - shard_size: Número máximo de ejemplos por shard.
+    - dtype: Tipo de dato de los shards. Con 'float32' la lectura no necesita conversión.
+
+    Retorna:
+    - La ruta del índice.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    source = FeatureDataset(feature_dir, feature=feature, size=size, channels=1)
+
+    shards = []
+    labels = []
+    samples = []
+    for label, cls_name in enumerate(source.classes):
+        indices = [i for i, l in enumerate(source.labels) if l == label]
+        for shard_idx, start in enumerate(range(0, len(indices), shard_size)):
+            batch = indices[start:start + shard_size]
+            examples = (source[i][0][0].numpy() for i in batch)
+            filename = f'{cls_name}_{shard_idx:05d}.npy'
+            _write_shard(os.path.join(output_dir, filename), examples, len(batch), size, dtype)
+            shards.append({'file': filename, 'class': cls_name, 'count': len(batch)})
+            for row, i in enumerate(batch):
+                labels.append(label)
+                samples.append({'shard': len(shards) - 1, 'row': row,
+                                'source': os.path.relpath(source.samples[i], feature_dir)})
+            logger.info('Shard %s guardado con %d ejemplos.', filename, len(batch))
+
+    with atomic_path(os.path.join(output_dir, LABELS_FILENAME)) as tmp_path:
+        np.save(tmp_path, np.array(labels, dtype=np.int64))
+
+    index = {
+        'classes': source.classes,
+        'feature': feature,
+        'shape': list(size),
+        'dtype': np.dtype(dtype).name,
+        'shards': shards,
+        'samples': samples,
+    }
+    index_path = os.path.join(output_dir, INDEX_FILENAME)
+    write_metadata(index_path, index)
+    logger.info('Índice guardado en %s (%d ejemplos).', index_path, len(labels))
+    return index_path
@@ -1,42 +1,82 @@
 # sound_signal.py
 
-import numpy as np
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
-from .base_signal import BaseSignal
-from .utils import normalize_signal
+import logging
+import numpy as np
+from .base_signal import BaseSignal, DEFAULT_BLOCK_SIZE, DEFAULT_DTYPE
+from .oscillators import tile_cycle
+from .instrumentation import timed, count
+
+logger = logging.getLogger(__name__)
 
 class Signal(BaseSignal):
-    def __init__(self, amplitude, freq, phase, sample_rate=44100, duration_seg=5.0):
-        super().__init__(sample_rate, duration_seg)
+    def __init__(self, amplitude, freq, phase, sample_rate=44100, duration_seg=5.0, oscillator='cos',
+                 dtype=DEFAULT_DTYPE, period=None):
+        super().__init__(sample_rate, duration_seg, oscillator, dtype, period)
         self.amplitude = amplitude
         self.freq = freq
         self.phase = phase
         self.signal = None
 
+    @timed('signal.generate')
     def generate_signal(self):
-        omega = 2 * np.pi * self.freq
-        self.signal = self.amplitude * np.cos(omega * self.t + self.phase)
-        print(f"Señal generada: {self.amplitude} * cos(2π{self.freq}t + {self.phase})")
+        length, (freq,) = self._cycle_length([self.freq])
+        if length is None:
+            self.signal = self._oscillate(self.freq, self.phase)
+            self.signal *= self.amplitude
+            self._cycle = None
+        else:
+            # Un solo ciclo evaluado y copiado hasta completar la duración
+            cycle = self._oscillate(freq, self.phase, 0, length)
+            cycle *= self.amplitude
+            self.signal = tile_cycle(cycle, self.num_samples)
+            self._cycle = self.signal[:length]
+        count('samples_rendered', len(self.signal))
+        logger.info('Señal generada: %s * cos(2π%st + %s)', self.amplitude, self.freq, self.phase)
+
+    def iter_blocks(self, block_size=DEFAULT_BLOCK_SIZE):
+        length, (freq,) = self._cycle_length([self.freq])
+        if length is not None:
+            # Los mismos bloques que generate_signal: copias del ciclo con frecuencia cuantizada
+            cycle = self._oscillate(freq, self.phase, 0, length)
+            cycle *= self.amplitude
+        for start in range(0, self.num_samples, block_size):
+            stop = min(start + block_size, self.num_samples)
+            if length is None:
+                block = self._oscillate(self.freq, self.phase, start, stop)
+                block *= self.amplitude
+            else:
+                block = cycle.take(np.arange(start, stop), mode='wrap')
+            yield block
+
+    def predicted_peak(self):
+        return abs(self.amplitude)
 
 
     def save_wav(self, filename):
         if self.signal is None:
             raise ValueError("La señal no ha sido generada. Llama a generate_signal() primero.")
 
+        # Con un periodo forzado la frecuencia sintetizada es la cuantizada, no la pedida
+        _, (rendered_freq,) = self._cycle_length([self.freq])
         metadata = {
             'amplitude': self.amplitude,
             'freq': self.freq,
+            'rendered_freq': float(rendered_freq),
             'phase': self.phase,
+            'period': self.period,
             'sample_rate': self.sample_rate,
             'duration_seg': self.duration_seg
         }
         super().save_wav(filename=filename, metadata=metadata)
 
+    @timed('plot.signal')
     def plot_signal(self, save_path=None, show=False):
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
         if self.signal is None:
-            print("No se ha generado la señal.")
+            logger.warning("No se ha generado la señal.")
             return
 
         plt.figure(figsize=(10, 4))
@@ -62,7 +102,7 @@ class Signal(BaseSignal):
             if directory and not os.path.exists(directory):
                 os.makedirs(directory)
             plt.savefig(save_path)
-            print(f'Gráfica guardada en {save_path}')
+            logger.info('Gráfica guardada en %s', save_path)
         if show:
             plt.show()
         plt.close()
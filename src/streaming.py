@@ -0,0 +1,208 @@
+# streaming.py
+#
+# Clasificación de audio largo por ventanas deslizantes. El audio llega por bloques (de un
+# archivo o de un generador como RhythmSignal.render_blocks), la STFT se calcula de forma
+# incremental una sola vez por frame y cada ventana reutiliza los frames que comparte con
+# la anterior.
+#
+#   python -m src.streaming grabacion.wav --checkpoint cnn_lstm_features.pth --hop 1.0
+
+import wave
+import logging
+import argparse
+import numpy as np
+import torch
+from .dataset_generator import CLASSES, SAMPLE_RATE, DURATION_SEG
+from .audio_io import iter_wav_blocks
+from .feature_engine import get_engine, to_model_input_batch
+from .features import NPERSEG, NOVERLAP, MAX_FREQ
+from .model import require_feature_checkpoint
+
+logger = logging.getLogger(__name__)
+
+
+class RollingSpectrogram:
+    """
+    Espectrograma logarítmico incremental con los mismos frames que compute_spectrogram
+    sobre la señal completa: el frame k empieza en la muestra k·(nperseg - noverlap). Solo
+    se conservan las muestras que aún no forman un frame completo.
+    """
+    def __init__(self, sample_rate=SAMPLE_RATE, nperseg=NPERSEG, noverlap=NOVERLAP, max_freq=MAX_FREQ):
+        self.engine = get_engine(sample_rate, nperseg=nperseg, noverlap=noverlap, max_freq=max_freq)
+        self.nperseg = nperseg
+        self.step = nperseg - noverlap
+        self.frames_emitted = 0
+        self._pending = np.empty(0, dtype=np.float32)
+
+    @property
+    def n_freqs(self):
+        return self.engine.n_freqs
+
+    def push(self, block):
+        """
+        Añade un bloque de muestras y retorna los frames nuevos como matriz (frecuencias, n).
+        """
+        pending = np.concatenate([self._pending, np.asarray(block, dtype=np.float32)])
+        if len(pending) < self.nperseg:
+            self._pending = pending
+            return np.empty((self.n_freqs, 0), dtype=np.float32)
+        n_frames = (len(pending) - self.nperseg) // self.step + 1
+        columns = self.engine.log_spectrogram(pending[np.newaxis, :(n_frames - 1) * self.step + self.nperseg])[0]
+        self._pending = pending[n_frames * self.step:]
+        self.frames_emitted += n_frames
+        return columns
+
+
+class StreamingClassifier:
+    """
+    Clasificador por ventanas deslizantes de window_seg segundos que avanzan hop_seg
+    segundos. Cada ventana se convierte en la entrada de CNN_LSTM igual que un clip
+    completo y las ventanas se evalúan en lotes de batch_windows.
+
+    Las ventanas empiezan en frames de la STFT, así que window_seg y hop_seg se redondean a
+    frames completos (nperseg - noverlap muestras); los atributos window_seg y hop_seg
+    guardan los valores realmente usados, que son los que reflejan los tiempos de la línea
+    de tiempo.
+
+    Sin model se carga checkpoint, que debe estar entrenado con las características de
+    FeatureEngine (train_model.py --source features; ver model.require_feature_checkpoint).
+    Un model ya construido debe cumplir lo mismo.
+
+    Con carry_state=True el estado (h, c) de la LSTM de cada ventana es el estado inicial
+    de la siguiente y las ventanas se evalúan en orden, una a una. El checkpoint actual se
+    entrenó con estado inicial cero, así que esta opción solo tiene sentido con modelos
+    entrenados en modo streaming.
+    """
+    def __init__(self, model=None, sample_rate=SAMPLE_RATE, window_seg=DURATION_SEG, hop_seg=1.0,
+                 carry_state=False, batch_windows=16, size=(128, 128), channels=3, checkpoint=None):
+        if model is None:
+            if checkpoint is None:
+                raise ValueError("Indica model o un checkpoint entrenado con --source features.")
+            require_feature_checkpoint(checkpoint, 'spectrogram')
+            from .inference import build_inference_model
+            model = build_inference_model(checkpoint, mode='eager')
+        self.model = model
+        self.sample_rate = sample_rate
+        self.carry_state = carry_state
+        self.batch_windows = 1 if carry_state else batch_windows
+        self.size = size
+        self.channels = channels
+        self.classes = CLASSES
+
+        self.spectrogram = RollingSpectrogram(sample_rate)
+        step = self.spectrogram.step
+        self.window_frames = (int(window_seg * sample_rate) - self.spectrogram.nperseg) // step + 1
+        self.hop_frames = max(1, int(round(hop_seg * sample_rate / step)))
+        # Duraciones reales: la ventana abarca window_frames frames y avanza hop_frames frames
+        self.window_seg = ((self.window_frames - 1) * step + self.spectrogram.nperseg) / sample_rate
+        self.hop_seg = self.hop_frames * step / sample_rate
+        if self.window_seg != window_seg or self.hop_seg != hop_seg:
+            logger.info('Ventana de %.4f s con avance de %.4f s (múltiplos de %d muestras).',
+                        self.window_seg, self.hop_seg, step)
+        self.reset()
+
+    def reset(self):
+        """
+        Descarta el audio, las ventanas pendientes y el estado de la LSTM.
+        """
+        self.spectrogram = RollingSpectrogram(self.sample_rate)
+        self._columns = np.empty((self.spectrogram.n_freqs, 0), dtype=np.float32)
+        self._first_frame = 0  # Índice absoluto del primer frame conservado
+        self._next_window = 0  # Frame en el que empieza la siguiente ventana
+        self._windows = []  # (frame inicial, características) pendientes de evaluar
+        self._state = None
+
+    def push(self, block):
+        """
+        Añade un bloque de audio y retorna las entradas de la línea de tiempo que ya se
+        pudieron evaluar (puede ser una lista vacía).
+        """
+        columns = self.spectrogram.push(block)
+        if columns.shape[1]:
+            self._columns = np.concatenate([self._columns, columns], axis=1)
+
+        available = self._first_frame + self._columns.shape[1]
+        while self._next_window + self.window_frames <= available:
+            offset = self._next_window - self._first_frame
+            self._windows.append((self._next_window, self._columns[:, offset:offset + self.window_frames]))
+            self._next_window += self.hop_frames
+
+        # Conservar solo los frames que aún pertenecen a alguna ventana futura
+        drop = min(self._next_window - self._first_frame, self._columns.shape[1])
+        if drop > 0:
+            self._columns = self._columns[:, drop:]
+            self._first_frame += drop
+
+        if len(self._windows) >= self.batch_windows:
+            return self._evaluate()
+        return []
+
+    def flush(self):
+        """
+        Evalúa las ventanas pendientes. El audio final que no completa una ventana no se evalúa.
+        """
+        return self._evaluate() if self._windows else []
+
+    def classify(self, blocks):
+        """
+        Clasifica un flujo de bloques y genera las entradas de la línea de tiempo en orden.
+        """
+        for block in blocks:
+            yield from self.push(block)
+        yield from self.flush()
+
+    def classify_file(self, filename, block_size=65536):
+        """
+        Clasifica un archivo WAV leyéndolo por bloques.
+        """
+        with wave.open(filename, 'rb') as wav:
+            if wav.getframerate() != self.sample_rate:
+                raise ValueError(f"El archivo tiene {wav.getframerate()} Hz; el clasificador espera "
+                                 f"{self.sample_rate} Hz.")
+        return self.classify(iter_wav_blocks(filename, block_size))
+
+    def _evaluate(self):
+        starts, features = zip(*self._windows)
+        self._windows = []
+        x = to_model_input_batch(np.stack(features), size=self.size, channels=self.channels)
+        with torch.inference_mode():
+            if self.carry_state:
+                logits = []
+                for row in x:
+                    out, self._state = self.model.forward_with_state(row.unsqueeze(0), self._state)
+                    logits.append(out)
+                logits = torch.cat(logits)
+            else:
+                logits = self.model(x)
+        probabilities = torch.softmax(logits.float(), dim=1).tolist()
+
+        timeline = []
+        for start_frame, probs in zip(starts, probabilities):
+            start = start_frame * self.spectrogram.step / self.sample_rate
+            timeline.append({
+                'start': start,
+                'end': start + self.window_seg,
+                'label': self.classes[int(np.argmax(probs))],
+                'probabilities': dict(zip(self.classes, probs)),
+            })
+        return timeline
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clasificación por ventanas deslizantes de un WAV largo.")
+    parser.add_argument('filename')
+    parser.add_argument('--checkpoint', required=True,
+                        help="state_dict entrenado con train_model.py --source features (o shards).")
+    parser.add_argument('--window', type=float, default=DURATION_SEG, help="Duración de cada ventana (s).")
+    parser.add_argument('--hop', type=float, default=1.0, help="Avance entre ventanas (s).")
+    parser.add_argument('--carry-state', action='store_true', help="Encadenar el estado de la LSTM entre ventanas.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    with wave.open(args.filename, 'rb') as wav:
+        sample_rate = wav.getframerate()
+    classifier = StreamingClassifier(sample_rate=sample_rate, window_seg=args.window, hop_seg=args.hop,
+                                     carry_state=args.carry_state, checkpoint=args.checkpoint)
+    for entry in classifier.classify_file(args.filename):
+        print(f"{entry['start']:9.2f}s - {entry['end']:9.2f}s  {entry['label']:<15} "
+              f"({entry['probabilities'][entry['label']]:.2f})")
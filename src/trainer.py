@@ -0,0 +1,354 @@
+# trainer.py
+#
+# Entrenamiento de CNN_LSTM en CPU (el train_model de NN.ipynb empaquetado): las entradas
+# se guardan ya decodificadas y normalizadas en memoria durante la primera época, los
+# workers del DataLoader son persistentes, hay autocast bf16 y acumulación de gradientes
+# opcionales, y el estado completo se guarda periódicamente para poder reanudar.
+
+import os
+import time
+import logging
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, Dataset, Sampler
+from .audio_io import atomic_path, write_metadata
+from .instrumentation import timer, count
+from .model import CNN_LSTM, NUM_CLASSES, metadata_path
+
+logger = logging.getLogger(__name__)
+
+# Archivo de estado dentro de checkpoint_dir
+CHECKPOINT_FILENAME = 'last.pt'
+
+
+class IndexedDataset(Dataset):
+    """
+    Envoltorio que retorna también el índice de cada ejemplo, para poder guardarlo en la caché.
+    """
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, idx):
+        x, label = self.dataset[idx]
+        return x, label, idx
+
+
+class EpochSampler(Sampler):
+    """
+    Orden de los ejemplos de cada época: una permutación determinada por (seed, época), o el
+    orden natural si shuffle es False. start permite reanudar una época a medias. El
+    DataLoader vuelve a iterar el mismo objeto en cada época, así que los workers
+    persistentes siguen sirviendo aunque el orden cambie.
+    """
+    def __init__(self, size, shuffle=True, seed=0):
+        self.size = size
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+        self.start = 0
+
+    def set_epoch(self, epoch, start=0):
+        self.epoch = epoch
+        self.start = start
+
+    def order(self):
+        if not self.shuffle:
+            return torch.arange(self.size)
+        generator = torch.Generator().manual_seed(self.seed * 100003 + self.epoch)
+        return torch.randperm(self.size, generator=generator)
+
+    def __iter__(self):
+        return iter(self.order()[self.start:].tolist())
+
+    def __len__(self):
+        return self.size - self.start
+
+
+class TensorCache:
+    """
+    Entradas y etiquetas de un dataset guardadas en un único tensor (N, ...) preasignado.
+    Se llena con los lotes de la primera época; cuando está completa las épocas siguientes
+    se sirven indexando el tensor, sin workers ni decodificación.
+    """
+    def __init__(self, size, dtype=torch.float32):
+        self.size = size
+        self.dtype = dtype
+        self.inputs = None  # Se asigna con la forma del primer lote
+        self.labels = torch.empty(size, dtype=torch.long)
+        self._filled = torch.zeros(size, dtype=torch.bool)
+
+    @property
+    def complete(self):
+        return bool(self._filled.all())
+
+    def store(self, indices, inputs, labels):
+        if self.inputs is None:
+            self.inputs = torch.empty((self.size, *inputs.shape[1:]), dtype=self.dtype)
+        self.inputs[indices] = inputs.to(self.dtype)
+        self.labels[indices] = labels
+        self._filled[indices] = True
+
+    def batches(self, order, batch_size):
+        for indices in order.split(batch_size):
+            yield self.inputs[indices].float(), self.labels[indices]
+
+
+class Trainer:
+    """
+    Bucle de entrenamiento y validación de CNN_LSTM en CPU.
+
+    Uso:
+        trainer = Trainer(train_dataset, val_dataset, checkpoint_dir='checkpoints', bf16=True)
+        history = trainer.fit(epochs=10)  # Reanuda desde checkpoints/last.pt si existe
+        trainer.save_model('cnn_lstm_model.pth')
+
+    Parámetros:
+    - train_dataset, val_dataset: Datasets que retornan (tensor (3, 128, 128), etiqueta),
+      p. ej. SpectrogramImageDataset, FeatureDataset o ShardedDataset.
+    - model: Modelo a entrenar; por defecto un CNN_LSTM nuevo.
+    - batch_size: Ejemplos por micro-lote.
+    - accumulation_steps: Micro-lotes por paso del optimizador (lote efectivo
+      batch_size · accumulation_steps).
+    - num_workers: Workers del DataLoader (persistentes) mientras la caché no está completa.
+    - cache: Si es True guarda las entradas en memoria durante la primera época.
+    - cache_dtype: Tipo de las entradas en caché (torch.float16 la reduce a la mitad).
+    - bf16: Si es True el forward se ejecuta con autocast bfloat16 en CPU.
+    - checkpoint_dir: Directorio del estado de reanudación, o None para no guardarlo.
+    - checkpoint_every: Pasos del optimizador entre checkpoints (además del final de cada época).
+    - log_every: Pasos del optimizador entre mensajes de pérdida y ejemplos/s.
+    - seed: Semilla de la inicialización y del orden de los ejemplos.
+    """
+    def __init__(self, train_dataset, val_dataset=None, model=None, batch_size=32, lr=1e-3,
+                 accumulation_steps=1, num_workers=2, cache=True, cache_dtype=torch.float32, bf16=False,
+                 checkpoint_dir=None, checkpoint_every=100, log_every=20, seed=0):
+        torch.manual_seed(seed)
+        self.model = model if model is not None else CNN_LSTM(NUM_CLASSES)
+        self.criterion = nn.CrossEntropyLoss()
+        self.optimizer = torch.optim.Adam(self.model.parameters(), lr=lr)
+        self.batch_size = batch_size
+        self.accumulation_steps = accumulation_steps
+        self.bf16 = bf16
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_every = checkpoint_every
+        self.log_every = log_every
+
+        self.train_sampler = EpochSampler(len(train_dataset), shuffle=True, seed=seed)
+        self.train_loader = self._loader(train_dataset, self.train_sampler, num_workers)
+        self.train_cache = TensorCache(len(train_dataset), cache_dtype) if cache else None
+        if val_dataset is not None:
+            self.val_sampler = EpochSampler(len(val_dataset), shuffle=False)
+            self.val_loader = self._loader(val_dataset, self.val_sampler, num_workers)
+            self.val_cache = TensorCache(len(val_dataset), cache_dtype) if cache else None
+        else:
+            self.val_loader = None
+
+        # Estado de reanudación: época actual y micro-lotes ya aplicados en ella
+        self.epoch = 0
+        self.batch = 0
+        self.step = 0
+        self.trained = None  # (pérdida, precisión, ejemplos/s) de una época entrenada y aún sin evaluar
+        self.history = {'train_loss': [], 'train_acc': [], 'val_loss': [], 'val_acc': []}
+
+    def _loader(self, dataset, sampler, num_workers):
+        return DataLoader(IndexedDataset(dataset), batch_size=self.batch_size, sampler=sampler,
+                          num_workers=num_workers, persistent_workers=num_workers > 0,
+                          prefetch_factor=4 if num_workers > 0 else None,
+                          pin_memory=torch.cuda.is_available())
+
+    def _batches(self, loader, sampler, cache, epoch, start):
+        """
+        Micro-lotes (entradas, etiquetas) de una época a partir del micro-lote start: de la
+        caché si está completa o del DataLoader, guardándolos en la caché a la vez.
+        """
+        sampler.set_epoch(epoch, start * self.batch_size)
+        if cache is not None and cache.complete:
+            yield from cache.batches(sampler.order()[start * self.batch_size:], self.batch_size)
+            return
+        for inputs, labels, indices in loader:
+            if cache is not None:
+                cache.store(indices, inputs, labels)
+            yield inputs, labels
+
+    def _forward(self, inputs):
+        with torch.autocast('cpu', dtype=torch.bfloat16, enabled=self.bf16):
+            return self.model(inputs).float()
+
+    def train_epoch(self):
+        """
+        Entrena una época (o lo que quede de ella tras reanudar).
+
+        Retorna:
+        - (pérdida media, precisión en %) de los micro-lotes ejecutados.
+        """
+        self.model.train()
+        running_loss = torch.zeros(())
+        correct = torch.zeros((), dtype=torch.long)
+        total = 0
+        pending = 0  # Micro-lotes acumulados desde el último paso del optimizador
+        window_start, window_samples = time.perf_counter(), 0
+
+        self.optimizer.zero_grad(set_to_none=True)
+        batches = self._batches(self.train_loader, self.train_sampler, self.train_cache, self.epoch, self.batch)
+        for inputs, labels in batches:
+            outputs = self._forward(inputs)
+            loss = self.criterion(outputs, labels)
+            (loss / self.accumulation_steps).backward()
+            pending += 1
+
+            # Acumular sin .item() para no sincronizar en cada micro-lote
+            running_loss += loss.detach() * labels.size(0)
+            correct += (outputs.argmax(dim=1) == labels).sum()
+            total += labels.size(0)
+            window_samples += labels.size(0)
+
+            if pending == self.accumulation_steps:
+                self._optimizer_step(pending)
+                pending = 0
+                if self.step % self.log_every == 0:
+                    elapsed = time.perf_counter() - window_start
+                    logger.info('Época %d, paso %d: pérdida %.4f, %.1f ejemplos/s', self.epoch + 1, self.step,
+                                running_loss.item() / total, window_samples / elapsed)
+                    window_start, window_samples = time.perf_counter(), 0
+                if self.checkpoint_every and self.step % self.checkpoint_every == 0:
+                    self.save_checkpoint()
+        if pending:
+            self._optimizer_step(pending)
+
+        count('samples_trained', total)
+        if not total:
+            return float('nan'), float('nan')
+        return running_loss.item() / total, 100 * correct.item() / total
+
+    def _optimizer_step(self, micro_batches):
+        if micro_batches < self.accumulation_steps:
+            # Último grupo incompleto de la época: reescalar a la media de sus micro-lotes
+            for param in self.model.parameters():
+                if param.grad is not None:
+                    param.grad *= self.accumulation_steps / micro_batches
+        self.optimizer.step()
+        self.optimizer.zero_grad(set_to_none=True)
+        self.step += 1
+        self.batch += micro_batches
+
+    def evaluate(self):
+        """
+        Pérdida media y precisión (%) sobre el conjunto de validación.
+        """
+        self.model.eval()
+        loss_sum = torch.zeros(())
+        correct = torch.zeros((), dtype=torch.long)
+        total = 0
+        with torch.no_grad():
+            for inputs, labels in self._batches(self.val_loader, self.val_sampler, self.val_cache, 0, 0):
+                outputs = self._forward(inputs)
+                loss_sum += self.criterion(outputs, labels) * labels.size(0)
+                correct += (outputs.argmax(dim=1) == labels).sum()
+                total += labels.size(0)
+        return loss_sum.item() / total, 100 * correct.item() / total
+
+    def fit(self, epochs, resume=True):
+        """
+        Entrena hasta completar epochs épocas. Con resume=True continúa desde el último
+        checkpoint de checkpoint_dir si existe. Si el proceso se interrumpe con Ctrl+C se
+        guarda el estado del último paso del optimizador antes de salir.
+
+        Retorna:
+        - Historial con 'train_loss', 'train_acc', 'val_loss' y 'val_acc' por época.
+        """
+        if resume and self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            self.load_checkpoint(self.checkpoint_path)
+
+        try:
+            while self.epoch < epochs:
+                if self.trained is None:
+                    start = time.perf_counter()
+                    with timer('train.epoch'):
+                        train_loss, train_acc = self.train_epoch()
+                    throughput = len(self.train_sampler) / (time.perf_counter() - start)
+                    # Si se interrumpe la evaluación, al reanudar solo se repite la evaluación
+                    self.trained = (train_loss, train_acc, throughput)
+                    self.save_checkpoint()
+                else:
+                    logger.info('La época %d ya estaba entrenada; se repite solo la evaluación.', self.epoch + 1)
+                train_loss, train_acc, throughput = self.trained
+
+                if self.val_loader is not None:
+                    with timer('train.evaluate'):
+                        val_loss, val_acc = self.evaluate()
+                else:
+                    val_loss = val_acc = float('nan')
+                for key, value in zip(self.history, (train_loss, train_acc, val_loss, val_acc)):
+                    self.history[key].append(value)
+                logger.info('Epoch [%d/%d], Train Loss: %.4f, Train Acc: %.2f%%, Val Loss: %.4f, '
+                            'Val Acc: %.2f%% (%.1f ejemplos/s)', self.epoch + 1, epochs, train_loss, train_acc,
+                            val_loss, val_acc, throughput)
+
+                self.epoch += 1
+                self.batch = 0
+                self.trained = None
+                self.save_checkpoint()
+        except KeyboardInterrupt:
+            logger.warning('Entrenamiento interrumpido en la época %d, paso %d.', self.epoch + 1, self.step)
+            self.save_checkpoint()
+            raise
+        return self.history
+
+    @property
+    def checkpoint_path(self):
+        if self.checkpoint_dir is None:
+            return None
+        return os.path.join(self.checkpoint_dir, CHECKPOINT_FILENAME)
+
+    def save_checkpoint(self, path=None):
+        """
+        Guarda de forma atómica el modelo, el optimizador, la posición (época, micro-lote,
+        paso, si la época ya está entrenada pero sin evaluar) y el historial.
+        """
+        path = path or self.checkpoint_path
+        if path is None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        state = {
+            'model': self.model.state_dict(),
+            'optimizer': self.optimizer.state_dict(),
+            'epoch': self.epoch,
+            'batch': self.batch,
+            'step': self.step,
+            'trained': self.trained,
+            'history': self.history,
+            'rng_state': torch.get_rng_state(),
+        }
+        with atomic_path(path) as tmp_path:
+            torch.save(state, tmp_path)
+        logger.debug('Checkpoint guardado en %s (época %d, paso %d)', path, self.epoch + 1, self.step)
+
+    def load_checkpoint(self, path):
+        state = torch.load(path, map_location='cpu', weights_only=True)
+        self.model.load_state_dict(state['model'])
+        self.optimizer.load_state_dict(state['optimizer'])
+        self.epoch = state['epoch']
+        self.batch = state['batch']
+        self.step = state['step']
+        self.trained = state.get('trained')
+        self.history = state['history']
+        torch.set_rng_state(state['rng_state'])
+        logger.info('Reanudando desde %s: época %d, micro-lote %d, paso %d', path, self.epoch + 1, self.batch,
+                    self.step)
+
+    def save_model(self, path, metadata=None):
+        """
+        Guarda solo el state_dict del modelo, en el formato que lee model.load_model.
+
+        Parámetros:
+        - path: Ruta del state_dict.
+        - metadata: Diccionario opcional (p. ej. {'input': 'features', 'feature': 'spectrogram'})
+          que se guarda junto al modelo (ver model.checkpoint_metadata).
+        """
+        with atomic_path(path) as tmp_path:
+            torch.save(self.model.state_dict(), tmp_path)
+        if metadata:
+            write_metadata(metadata_path(path), metadata)
+        logger.info('Modelo guardado en %s', path)
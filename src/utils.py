@@ -1,21 +1,35 @@
 # utils.py
 
+from functools import lru_cache
 import numpy as np
-import matplotlib.pyplot as plt
-import librosa
-import librosa.display
-import seaborn as sns
-from scipy.signal import spectrogram
 
 
 INT16_MAX = 32767
 
-def normalize_signal(signal):
+# Funciones de graficado que viven en viz.py; se importan solo cuando se piden, para que
+# la síntesis no cargue matplotlib, seaborn ni librosa.
+_VIZ_FUNCTIONS = ('plot_spectrogram', 'plot_chromagram')
+
+
+def __getattr__(name):
+    if name in _VIZ_FUNCTIONS:
+        from . import viz
+        return getattr(viz, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def normalize_signal(signal, inplace=False):
     """
     Normaliza una señal para que sus valores estén dentro del rango [-1, 1].
+
+    Parámetros:
+    - signal: Arreglo de punto flotante.
+    - inplace: Si es True divide sobre el propio arreglo en lugar de crear una copia.
     """
-    max_val = np.max(np.abs(signal))
+    max_val = max(np.max(signal), -np.min(signal))  # Pico sin crear la copia de np.abs
     if max_val > 1e-8:                  # Añadido un pequeño umbral
+        if inplace:
+            signal /= max_val
+            return signal
         return signal / max_val
     else:
         return signal
@@ -39,38 +53,6 @@ def analyze_components(components):
         print(f"{idx + 1:<12}{component['amplitude']:<15.4f}{component['freq']:<20.2f}{phase_pi:<10.2f}")
 
 
-def plot_spectrogram(signal, sample_rate, save_path=None, max_freq=8000):
-    """
-    Genera y grafica el espectrograma de una señal, limitando la frecuencia máxima mostrada.
-    
-    Parámetros:
-    - signal: La señal de audio a analizar.
-    - sample_rate: La tasa de muestreo de la señal.
-    - save_path: Ruta para guardar el espectrograma. Si es None, solo se muestra.
-    - max_freq: Frecuencia máxima a mostrar en el espectrograma (en Hz).
-    """
-    try:
-        f, t, Sxx = spectrogram(signal, fs=sample_rate, nperseg=1024, noverlap=512)
-        plt.figure(figsize=(10, 6))
-        plt.pcolormesh(t, f, 10 * np.log10(Sxx + 1e-10), shading='gouraud')
-        plt.ylabel('Frecuencia [Hz]')
-        plt.xlabel('Tiempo [s]')
-        plt.colorbar(label='Amplitud [dB]')
-        plt.title('Espectrograma')
-        plt.ylim(0, max_freq)  # Limitar el eje Y a max_freq Hz
-        plt.tight_layout()
-
-        if save_path:
-            plt.savefig(save_path)
-            print(f'Espectrograma guardado en {save_path}')
-        else:
-            plt.show()
-        plt.close()
-    except Exception as e:
-        print(f"Error al generar el espectrograma: {e}")
-
-
-
 def calculate_note_frequencies(octave_range=(0, 8), ref_freq=440.0):
     """
     Calcula las frecuencias de las notas en el rango de octavas especificado
@@ -101,13 +83,102 @@ def calculate_note_frequencies(octave_range=(0, 8), ref_freq=440.0):
 
 
 
+class NoteTable:
+    """
+    Tabla de notas ordenada por frecuencia, con búsquedas vectorizadas.
+
+    Guarda los nombres, las frecuencias y sus log2 ordenados, y los puntos medios (en escala
+    logarítmica) entre notas consecutivas; la nota más cercana a una frecuencia se obtiene con
+    np.searchsorted sobre esos puntos medios, para un valor o para un arreglo completo.
+    """
+    def __init__(self, note_frequencies):
+        items = sorted(note_frequencies.items(), key=lambda item: item[1])
+        self.names = np.array([name for name, _ in items])
+        self.freqs = np.array([freq for _, freq in items], dtype=float)
+        self.log_freqs = np.log2(self.freqs)
+        self._midpoints = (self.log_freqs[:-1] + self.log_freqs[1:]) / 2
+        self._index = {name: idx for idx, name in enumerate(self.names)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def frequency(self, name):
+        """
+        Frecuencia de una nota por nombre (por ejemplo 'A4').
+        """
+        return self.freqs[self._index[name]]
+
+    def to_dict(self):
+        return dict(zip(self.names, self.freqs))
+
+    def lookup(self, frequencies, tolerance_cents=50):
+        """
+        Índices de las notas más cercanas a un arreglo de frecuencias.
+
+        Parámetros:
+        - frequencies: Frecuencia o arreglo de frecuencias (por ejemplo, un seguimiento de tono por frame).
+        - tolerance_cents: Tolerancia en cents (1 semitono = 100 cents).
+
+        Retorna:
+        - Tupla (índices, desviaciones en cents). El índice es -1 (y la desviación NaN) para
+          frecuencias no positivas o fuera de la tolerancia.
+        """
+        frequencies = np.asarray(frequencies, dtype=float)
+        valid = frequencies > 0
+        log_f = np.log2(np.where(valid, frequencies, 1.0))
+        idx = np.searchsorted(self._midpoints, log_f)
+        cents = 1200 * (log_f - self.log_freqs[idx])
+        found = valid & (np.abs(cents) <= tolerance_cents)
+        return np.where(found, idx, -1), np.where(found, cents, np.nan)
+
+    def names_for(self, frequencies, tolerance_cents=50):
+        """
+        Nombres de las notas más cercanas a un arreglo de frecuencias (None fuera de tolerancia).
+        """
+        idx, _ = self.lookup(frequencies, tolerance_cents)
+        names = np.empty(idx.shape, dtype=object)
+        found = idx >= 0
+        names[found] = self.names[idx[found]]
+        return names
+
+
+@lru_cache(maxsize=32)
+def _cached_note_table(octave_range, ref_freq):
+    return NoteTable(calculate_note_frequencies(octave_range=octave_range, ref_freq=ref_freq))
+
+
+@lru_cache(maxsize=32)
+def _note_table_from_items(items):
+    return NoteTable(dict(items))
+
+
+def get_note_table(octave_range=(0, 8), ref_freq=440.0):
+    """
+    NoteTable del sistema temperado igual, construida una sola vez por (octave_range, ref_freq).
+    octave_range puede ser cualquier secuencia de dos enteros (tupla o lista).
+    """
+    return _cached_note_table((int(octave_range[0]), int(octave_range[1])), float(ref_freq))
+
+
+def as_note_table(note_frequencies):
+    """
+    Retorna note_frequencies como NoteTable. Los diccionarios (p. ej. el de
+    calculate_note_frequencies) se convierten una sola vez por contenido y la tabla se reutiliza.
+    """
+    if isinstance(note_frequencies, NoteTable):
+        return note_frequencies
+    return _note_table_from_items(tuple(note_frequencies.items()))
+
+
 def freq_to_note_name(frequency, note_frequencies, tolerance_cents=50):
     """
     Mapea una frecuencia a la nota más cercana dentro de una tolerancia dada en cents.
 
     Parámetros:
     - frequency: Frecuencia detectada.
-    - note_frequencies: Diccionario de notas y sus frecuencias.
+    - note_frequencies: NoteTable (ver get_note_table) o diccionario de notas y sus frecuencias.
+      La tabla de un diccionario se construye una vez y se reutiliza (ver as_note_table); para
+      muchas consultas conviene usar NoteTable.names_for sobre el arreglo completo.
     - tolerance_cents: Tolerancia en cents (1 semitono = 100 cents).
 
     Retorna:
@@ -116,41 +187,8 @@ def freq_to_note_name(frequency, note_frequencies, tolerance_cents=50):
     if frequency <= 0:
         return None
 
-    notes = np.array(list(note_frequencies.keys()))
-    freqs = np.array(list(note_frequencies.values()))
-    diff_cents = 1200 * np.log2(frequency / freqs)
-    within_tolerance = np.abs(diff_cents) <= tolerance_cents
-
-    if not np.any(within_tolerance):
+    table = as_note_table(note_frequencies)
+    idx, _ = table.lookup(frequency, tolerance_cents)
+    if idx < 0:
         return None
-
-    closest_idx = np.argmin(np.abs(diff_cents[within_tolerance]))
-    return notes[within_tolerance][closest_idx]
-
-
-def plot_chromagram(signal, sample_rate, save_path=None, fmax=8000):
-    """
-    Genera y grafica el chromagram de una señal de audio.
-
-    Parámetros:
-    - signal: La señal de audio a analizar.
-    - sample_rate: La tasa de muestreo de la señal.
-    - save_path: Ruta para guardar el chromagram. Si es None, solo se muestra.
-    - fmax: Frecuencia máxima a considerar en el análisis (en Hz).
-    """
-    try:
-        chromagram = librosa.feature.chroma_stft(y=signal, sr=sample_rate, tuning=0, norm=2)
-        plt.figure(figsize=(10, 4))
-        librosa.display.specshow(chromagram, x_axis='time', y_axis='chroma', sr=sample_rate, cmap='coolwarm')
-        plt.colorbar()
-        plt.title('Chromagram')
-        plt.tight_layout()
-
-        if save_path:
-            plt.savefig(save_path)
-            print(f'Chromagram guardado en {save_path}')
-        else:
-            plt.show()
-        plt.close()
-    except Exception as e:
-        print(f"Error al generar el chromagram: {e}")
\ No newline at end of file
+    return table.names[idx]
@@ -0,0 +1,80 @@
+# viz.py
+
+import logging
+import numpy as np
+import matplotlib.pyplot as plt
+import librosa
+import librosa.display
+from scipy.signal import spectrogram
+from .instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+
+@timed('plot.spectrogram')
+def plot_spectrogram(signal, sample_rate, save_path=None, max_freq=8000):
+    """
+    Genera y grafica el espectrograma de una señal, limitando la frecuencia máxima mostrada.
+    
+    Parámetros:
+    - signal: La señal de audio a analizar.
+    - sample_rate: La tasa de muestreo de la señal.
+    - save_path: Ruta para guardar el espectrograma. Si es None, solo se muestra. Si se
+      indica, los errores se registran y se propagan en lugar de ignorarse.
+    - max_freq: Frecuencia máxima a mostrar en el espectrograma (en Hz).
+    """
+    try:
+        f, t, Sxx = spectrogram(signal, fs=sample_rate, nperseg=1024, noverlap=512)
+        plt.figure(figsize=(10, 6))
+        plt.pcolormesh(t, f, 10 * np.log10(Sxx + 1e-10), shading='gouraud')
+        plt.ylabel('Frecuencia [Hz]')
+        plt.xlabel('Tiempo [s]')
+        plt.colorbar(label='Amplitud [dB]')
+        plt.title('Espectrograma')
+        plt.ylim(0, max_freq)  # Limitar el eje Y a max_freq Hz
+        plt.tight_layout()
+
+        if save_path:
+            plt.savefig(save_path)
+            logger.info('Espectrograma guardado en %s', save_path)
+        else:
+            plt.show()
+        plt.close()
+    except Exception as e:
+        logger.error('Error al generar el espectrograma: %s', e)
+        plt.close()
+        if save_path:
+            raise  # Quien guarda el archivo (p. ej. con atomic_path) debe ver el error real
+
+
+@timed('plot.chromagram')
+def plot_chromagram(signal, sample_rate, save_path=None, fmax=8000):
+    """
+    Genera y grafica el chromagram de una señal de audio.
+
+    Parámetros:
+    - signal: La señal de audio a analizar.
+    - sample_rate: La tasa de muestreo de la señal.
+    - save_path: Ruta para guardar el chromagram. Si es None, solo se muestra. Si se
+      indica, los errores se registran y se propagan en lugar de ignorarse.
+    - fmax: Frecuencia máxima a considerar en el análisis (en Hz).
+    """
+    try:
+        chromagram = librosa.feature.chroma_stft(y=signal, sr=sample_rate, tuning=0, norm=2)
+        plt.figure(figsize=(10, 4))
+        librosa.display.specshow(chromagram, x_axis='time', y_axis='chroma', sr=sample_rate, cmap='coolwarm')
+        plt.colorbar()
+        plt.title('Chromagram')
+        plt.tight_layout()
+
+        if save_path:
+            plt.savefig(save_path)
+            logger.info('Chromagram guardado en %s', save_path)
+        else:
+            plt.show()
+        plt.close()
+    except Exception as e:
+        logger.error('Error al generar el chromagram: %s', e)
+        plt.close()
+        if save_path:
+            raise  # Quien guarda el archivo (p. ej. con atomic_path) debe ver el error real
@@ -0,0 +1,56 @@
+# train_model.py
+
+import os
+import logging
+import argparse
+import torch
+from torch.utils.data import random_split
+from src.datasets import SpectrogramImageDataset, FeatureDataset, ShardedDataset
+from src.model import INPUT_IMAGES, INPUT_FEATURES
+from src.trainer import Trainer
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entrena CNN_LSTM en CPU con reanudación desde checkpoints.")
+    parser.add_argument('--data-dir', default='data', help="Directorio de los datos.")
+    parser.add_argument('--source', default='images', choices=['images', 'features', 'shards'],
+                        help="Espectrogramas PNG, características .npz (data/features) o shards .npy.")
+    parser.add_argument('--epochs', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--lr', type=float, default=0.001)
+    parser.add_argument('--accumulation-steps', type=int, default=1, help="Micro-lotes por paso del optimizador.")
+    parser.add_argument('--workers', type=int, default=2, help="Workers del DataLoader.")
+    parser.add_argument('--no-cache', action='store_true', help="No guardar las entradas en memoria.")
+    parser.add_argument('--bf16', action='store_true', help="Autocast bfloat16 en CPU.")
+    parser.add_argument('--checkpoint-dir', default='checkpoints')
+    parser.add_argument('--checkpoint-every', type=int, default=100, help="Pasos del optimizador entre checkpoints.")
+    parser.add_argument('--no-resume', action='store_true', help="Empezar de cero aunque exista un checkpoint.")
+    parser.add_argument('--output', default='cnn_lstm_model.pth', help="Ruta del state_dict final.")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format='%(message)s')
+    # Los metadatos indican con qué entradas se entrenó el modelo (ver model.checkpoint_metadata)
+    if args.source == 'images':
+        dataset = SpectrogramImageDataset(args.data_dir)
+        metadata = {'input': INPUT_IMAGES}
+    elif args.source == 'features':
+        dataset = FeatureDataset(os.path.join(args.data_dir, 'features'))
+        metadata = {'input': INPUT_FEATURES, 'feature': dataset.feature}
+    else:
+        dataset = ShardedDataset(args.data_dir)
+        metadata = {'input': INPUT_FEATURES, 'feature': dataset.index['feature']}
+    if len(dataset) == 0:
+        raise ValueError(f"No se encontraron ejemplos en {args.data_dir}.")
+
+    # División 80/20 con semilla fija, como en NN.ipynb
+    train_size = int(0.8 * len(dataset))
+    train_dataset, val_dataset = random_split(dataset, [train_size, len(dataset) - train_size],
+                                              generator=torch.Generator().manual_seed(args.seed))
+
+    trainer = Trainer(train_dataset, val_dataset, batch_size=args.batch_size, lr=args.lr,
+                      accumulation_steps=args.accumulation_steps, num_workers=args.workers,
+                      cache=not args.no_cache, bf16=args.bf16, checkpoint_dir=args.checkpoint_dir,
+                      checkpoint_every=args.checkpoint_every, seed=args.seed)
+    trainer.fit(args.epochs, resume=not args.no_resume)
+    trainer.save_model(args.output, metadata=metadata)